@@ -0,0 +1,129 @@
+#! python3
+# accumulator.py - Incremental net present value of a growing cash flow.
+
+from itertools import zip_longest
+import heapq
+
+from interest import CompoundInterest
+
+
+class NetPresentValueAccumulator(object):
+    """Class for a running net present value, updated in constant time as
+    cash flows are appended or removed. Missing values are filled from the
+    previous flow, as in AbstractInterest.net_present_value. With window,
+    only the flows of the last window periods are kept."""
+
+    def __init__(self, interest_system=CompoundInterest, window=None,
+                 valuation_period=0):
+        """Initializes a NetPresentValueAccumulator instance."""
+        self.interest_system = interest_system
+        self.window = window
+        self.valuation_period = valuation_period
+        self.net_present_value = 0.0
+        self._flows = {}
+        self._rates = {}
+        self._periods = []
+        self._latest_period = None
+        self._previous = (None, None, None)
+        self._next_handle = 0
+
+    def __len__(self):
+        return len(self._flows)
+
+    def _evict(self):
+        """Removes the flows older than the window."""
+        oldest = self._latest_period - self.window
+
+        while self._periods and self._periods[0][0] <= oldest:
+            _, handle = heapq.heappop(self._periods)
+
+            if handle in self._flows:
+                self.remove(handle)
+
+    def _present_value(self, future_value, interest_rate, periods):
+        """Calculates the present value of a flow at the valuation
+        period."""
+        return self.interest_system.present_value(
+            future_value, interest_rate=interest_rate,
+            periods=periods - self.valuation_period)
+
+    def append(self, future_value=None, interest_rate=None, periods=None):
+        """Adds a flow and returns a handle to remove it."""
+        prev_f, prev_i, prev_n = self._previous
+        f = future_value if future_value is not None else prev_f
+        i = interest_rate if interest_rate is not None else prev_i
+        n = periods if periods is not None else prev_n
+        self._previous = (f, i, n)
+        pv = self._present_value(f, i, n)
+        # Per interest rate: flow count, sum of present values and scale
+        # of the stored present values to the valuation period.
+        rate = self._rates.setdefault(i, [0, 0.0, 1.0])
+        rate[0] += 1
+        rate[1] += pv
+        self.net_present_value += pv
+        handle = self._next_handle
+        self._next_handle += 1
+        self._flows[handle] = (f, i, n, pv / rate[2])
+
+        if self.window is not None:
+            heapq.heappush(self._periods, (n, handle))
+
+            if self._latest_period is None or n > self._latest_period:
+                self._latest_period = n
+
+            self._evict()
+
+        return handle
+
+    def extend(self, future_values, interest_rates, periods):
+        """Adds the flows of a cash flow and returns their handles."""
+        return [self.append(f, i, n) for f, i, n in
+                zip_longest(future_values, interest_rates, periods)]
+
+    def rebase(self, valuation_period):
+        """Moves the valuation date to another period. Under compound
+        interest this rescales one running sum per interest rate;
+        otherwise the present values are recomputed."""
+        delta = valuation_period - self.valuation_period
+        self.valuation_period = valuation_period
+
+        if not issubclass(self.interest_system, CompoundInterest):
+            return self.recompute()
+
+        for i, rate in self._rates.items():
+            factor = self.interest_system.accumulation_factor(i, delta)
+            rate[1] *= factor
+            rate[2] *= factor
+
+        self.net_present_value = sum(rate[1] for rate in self._rates.values())
+        return self.net_present_value
+
+    def recompute(self):
+        """Recomputes the net present value from the stored flows,
+        discarding accumulated rounding errors."""
+        self._rates = {}
+        self.net_present_value = 0.0
+
+        for handle, (f, i, n, _) in self._flows.items():
+            pv = self._present_value(f, i, n)
+            rate = self._rates.setdefault(i, [0, 0.0, 1.0])
+            rate[0] += 1
+            rate[1] += pv
+            self.net_present_value += pv
+            self._flows[handle] = (f, i, n, pv)
+
+        return self.net_present_value
+
+    def remove(self, handle):
+        """Removes a flow by its handle."""
+        _, i, _, stored_pv = self._flows.pop(handle)
+        rate = self._rates[i]
+        pv = stored_pv * rate[2]
+        rate[0] -= 1
+        rate[1] -= pv
+        self.net_present_value -= pv
+
+        if rate[0] == 0:
+            del self._rates[i]
+            self.net_present_value = sum(
+                rate[1] for rate in self._rates.values())
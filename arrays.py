@@ -0,0 +1,23 @@
+#! python3
+# arrays.py - Optional NumPy support for batch calculations.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def is_array(*values):
+    """Checks whether any of the values is a NumPy array."""
+    if np is None:
+        return False
+
+    return any(isinstance(value, np.ndarray) for value in values)
+
+
+def require_numpy():
+    """If NumPy is not installed, throws ImportError exception."""
+    if np is None:
+        raise ImportError('batch calculations require NumPy')
+
+    return np
@@ -0,0 +1,173 @@
+#! python3
+# benchmark.py - Benchmarks with regression baselines for the hot paths.
+
+import argparse
+import json
+import sys
+import timeit
+
+from arrays import np
+from interest import CompoundInterest
+from interest import SimpleInterest
+from progression import ArithmeticProgression
+from progression import GeometricProgression
+from series import UniformSeriesPayment
+from series import factor_cache
+
+
+def _scalar_cases(size):
+    """Returns the scalar benchmarks, which loop size times in Python."""
+    rates = [0.001 + (k % 100)/10000 for k in range(size)]
+    values = [1000.0 + k for k in range(size)]
+    periods = [1 + k % 360 for k in range(size)]
+    progression = GeometricProgression(100.0, 1 / 1.01)
+    sequence = [1000.0 + k for k in range(max(size, 3))]
+
+    def series_present_value():
+        for i, n, v in zip(rates, periods, values):
+            UniformSeriesPayment(i, n, 1).present_value(v)
+
+    def series_payment():
+        for i, n, v in zip(rates, periods, values):
+            UniformSeriesPayment(i, n, 1).payment_by_present_value(v)
+
+    def series_factors(maxsize):
+        def case():
+            previous = factor_cache.maxsize
+            factor_cache.resize(maxsize)
+
+            try:
+                for i, n, v in zip(rates, periods, values):
+                    UniformSeriesPayment._pmt_by_pv(v, i, n, 1,
+                                                    CompoundInterest)
+            finally:
+                factor_cache.resize(previous)
+
+        return case
+
+    return {
+        'compound.present_value': lambda: [
+            CompoundInterest.present_value(v, interest_rate=i, periods=n)
+            for v, i, n in zip(values, rates, periods)],
+        'simple.present_value': lambda: [
+            SimpleInterest.present_value(v, interest_rate=i, periods=n)
+            for v, i, n in zip(values, rates, periods)],
+        'compound.net_present_value': lambda: (
+            CompoundInterest.net_present_value(values, rates, periods)),
+        'geometric.n_first_terms': lambda: (
+            GeometricProgression(100.0, 1 / 1.01).n_first_terms(size)),
+        'geometric.iter_terms': lambda: sum(progression.iter_terms(1,
+                                                                   size + 1)),
+        'arithmetic.is_arithmetic': lambda: (
+            ArithmeticProgression.is_arithmetic(sequence)),
+        'series.present_value': series_present_value,
+        'series.payment_by_present_value': series_payment,
+        'series.factor_cache': series_factors(4096),
+        'series.factor_cache_disabled': series_factors(0),
+    }
+
+
+def _batch_cases(size):
+    """Returns the NumPy batch benchmarks over arrays of size items."""
+    k = np.arange(size)
+    rates = 0.001 + (k % 100)/10000
+    values = 1000.0 + k
+    periods = 1 + k % 360
+    first_payments = k % 2
+    progression = GeometricProgression(100.0, 1 / 1.01)
+    sequence = 1000.0 + np.arange(max(size, 3))
+    width = 12
+    flows = np.resize(values, (max(size // width, 1), width))
+
+    return {
+        'compound.present_value': lambda: CompoundInterest.present_value(
+            values, interest_rate=rates, periods=periods),
+        'simple.present_value': lambda: SimpleInterest.present_value(
+            values, interest_rate=rates, periods=periods),
+        'compound.net_present_value_batch': lambda: (
+            CompoundInterest.net_present_value_batch(flows, rates[:width],
+                                                     np.arange(1, width + 1))),
+        'geometric.terms_array': lambda: progression.terms_array(1, size + 1),
+        'arithmetic.fit': lambda: ArithmeticProgression.fit(sequence),
+        'series.price_batch': lambda: UniformSeriesPayment.price_batch(
+            rates, periods, first_payments, values),
+    }
+
+
+def run(sizes, repeat=3, kinds=('scalar', 'batch')):
+    """Times every benchmark of the given kinds for every size. Batch
+    benchmarks are skipped without NumPy. Each timing loops the benchmark
+    enough times to run for at least 0.2 seconds. Returns a dict of the
+    best time per call in seconds by benchmark name."""
+    results = {}
+    cases_by_kind = {'scalar': _scalar_cases, 'batch': _batch_cases}
+
+    for kind in kinds:
+        if kind == 'batch' and np is None:
+            continue
+
+        for size in sizes:
+            for name, case in cases_by_kind[kind](size).items():
+                timer = timeit.Timer(case)
+                number, _ = timer.autorange()
+                key = '{}.{}[{}]'.format(kind, name, size)
+                results[key] = min(timer.repeat(repeat=repeat,
+                                                number=number)) / number
+
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """Returns the benchmarks slower than the baseline by more than the
+    threshold, as a dict of (baseline, result) times by name."""
+    regressions = {}
+
+    for name, seconds in results.items():
+        if name in baseline and seconds > baseline[name]*(1 + threshold):
+            regressions[name] = (baseline[name], seconds)
+
+    return regressions
+
+
+def main(argv=None):
+    """Runs the benchmarks from the command line. Exits with status 1
+    when a benchmark regresses past the threshold."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[1, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--kinds', nargs='+', choices=['scalar', 'batch'],
+                        default=['scalar', 'batch'])
+    parser.add_argument('--save', metavar='PATH',
+                        help='save the results as a JSON baseline')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare the results with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown over the baseline (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+    results = run(args.sizes, args.repeat, args.kinds)
+
+    for name, seconds in results.items():
+        print('{:<60} {:>12.3e} s'.format(name, seconds))
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file),
+                                  args.threshold)
+
+        for name, (before, after) in regressions.items():
+            print('REGRESSION {}: {:.3e} s -> {:.3e} s'.format(name, before,
+                                                               after))
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#! python3
+# cache.py - Bounded caches with usage statistics.
+
+from collections import OrderedDict
+from contextlib import nullcontext
+import threading
+
+_MISSING = object()
+_NO_LOCK = nullcontext()
+
+
+class LRUCache(object):
+    """Class for a least recently used cache. A maxsize of None keeps every
+    item and a maxsize of 0 disables the cache. Caches that are not thread
+    safe take no lock, and unbounded caches keep no recency order, so the
+    default cache costs little more than a dict."""
+
+    __slots__ = ('maxsize', 'hits', 'misses', 'evictions', '_items',
+                 '_lock')
+
+    def __init__(self, maxsize=None, thread_safe=False):
+        """Initializes a LRUCache instance."""
+        if maxsize is not None:
+            self._check_maxsize(maxsize)
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock() if thread_safe else None
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __getitem__(self, key):
+        if self._lock is None:
+            value = self._get(key, _MISSING)
+        else:
+            with self._lock:
+                value = self._get(key, _MISSING)
+
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __len__(self):
+        return len(self._items)
+
+    def __setitem__(self, key, value):
+        if self._lock is None:
+            if self.maxsize is None:
+                self._items[key] = value
+            else:
+                self._set(key, value)
+
+            return
+
+        with self._lock:
+            self._set(key, value)
+
+    @staticmethod
+    def _check_maxsize(maxsize):
+        """If the maximum size is not allowed, throws ValueError
+        exception."""
+        if maxsize is not None and maxsize < 0:
+            raise ValueError('maxsize must be None or greater than or equal '
+                             'to 0')
+
+    def _evict(self):
+        """Removes the least recently used items above the maximum size."""
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def _get(self, key, default):
+        """Returns the item for key, or default, counting the hit or
+        miss."""
+        value = self._items.get(key, _MISSING)
+
+        if value is _MISSING:
+            self.misses += 1
+            return default
+
+        if self.maxsize is not None:
+            self._items.move_to_end(key)
+
+        self.hits += 1
+        return value
+
+    def _set(self, key, value):
+        """Stores an item, evicting the least recently used ones."""
+        if self.maxsize == 0:
+            return
+
+        self._items[key] = value
+
+        if self.maxsize is not None:
+            self._items.move_to_end(key)
+            self._evict()
+
+    def get(self, key, default=None):
+        """Returns the item for key, or default if it is missing. On a
+        thread safe cache this read takes no lock, for hot paths: it does
+        not refresh the item's recency, so items read only this way are
+        evicted in insertion order, and the hit and miss counts it adds are
+        approximate under contention. Use cache[key] for exact LRU
+        bookkeeping."""
+        if self._lock is None:
+            return self._get(key, default)
+
+        value = self._items.get(key, _MISSING)
+
+        if value is _MISSING:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def clear(self):
+        """Removes every item and resets the statistics."""
+        with self._lock or _NO_LOCK:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def resize(self, maxsize):
+        """Changes the maximum size, evicting items if needed."""
+        self._check_maxsize(maxsize)
+
+        with self._lock or _NO_LOCK:
+            self.maxsize = maxsize
+
+            if maxsize is not None:
+                self._evict()
+
+    def stats(self):
+        """Returns the usage statistics."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self._items),
+                'maxsize': self.maxsize}
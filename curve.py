@@ -0,0 +1,109 @@
+#! python3
+# curve.py - Discount curves with precomputed discount factors.
+
+from bisect import bisect_right
+import math
+
+from arrays import is_array
+from arrays import np
+from arrays import require_numpy
+from interest import CompoundInterest
+
+LINEAR = 'linear'
+LOG_LINEAR = 'log-linear'
+
+
+class DiscountCurve(object):
+    """Class for a term structure of interest rates given by (period, rate)
+    points. The discount factors are precomputed at the points and at
+    every whole period between them; other periods are interpolated
+    linearly in the discount factors or in their logarithms. Before the
+    first point the curve starts from a factor of 1 at period 0, and after
+    the last point the last rate is kept."""
+
+    def __init__(self, periods, interest_rates,
+                 interest_system=CompoundInterest, interpolation=LINEAR):
+        """Initializes a DiscountCurve instance."""
+        if interpolation not in (LINEAR, LOG_LINEAR):
+            raise TypeError('interpolation must be {!r} or {!r}'.format(
+                LINEAR, LOG_LINEAR))
+
+        points = sorted(zip(periods, interest_rates))
+
+        if not points or points[0][0] < 0:
+            raise ValueError('periods should be non-negative and not empty')
+
+        if points[0][0] > 0:
+            points.insert(0, (0, 0.0))
+
+        self.interest_system = interest_system
+        self.interpolation = interpolation
+        self.periods = [float(n) for n, _ in points]
+        self.interest_rates = [float(i) for _, i in points]
+        self.factors = [float(interest_system.reduction_factor(i, n))
+                        for n, i in points]
+        self._values = self.factors
+
+        if interpolation == LOG_LINEAR:
+            self._values = [math.log(factor) for factor in self.factors]
+
+        first = math.ceil(self.periods[0])
+        self._first = first
+        self._table = [self._interpolate(n) for n in
+                       range(first, math.floor(self.periods[-1]) + 1)]
+        self._arrays = None
+
+        if np is not None:
+            self._arrays = (np.asarray(self._table), np.asarray(self.periods),
+                            np.asarray(self._values))
+
+    def _interpolate(self, n):
+        """Interpolates the discount factor of a period between points."""
+        k = min(bisect_right(self.periods, n), len(self.periods) - 1)
+        n_0, n_1 = self.periods[k - 1], self.periods[k]
+        v_0, v_1 = self._values[k - 1], self._values[k]
+        value = v_0 + (v_1 - v_0)*(n - n_0)/(n_1 - n_0) if n_1 > n_0 else v_0
+
+        if self.interpolation == LOG_LINEAR:
+            return math.exp(value)
+
+        return value
+
+    def discount_factor(self, periods):
+        """Returns the discount factor of a number of periods, or an array
+        of discount factors for an array of periods."""
+        if is_array(periods):
+            return self._discount_factors(periods)
+
+        if periods > self.periods[-1]:
+            return self.interest_system.reduction_factor(
+                self.interest_rates[-1], periods)
+
+        k = periods - self._first
+
+        if k >= 0 and k == int(k):
+            return self._table[int(k)]
+
+        return self._interpolate(periods)
+
+    def _discount_factors(self, periods):
+        """Returns the discount factors of an array of periods."""
+        require_numpy()
+        table, points, values = self._arrays
+        periods = np.asarray(periods, dtype=float)
+        k = periods - self._first
+        whole = (k >= 0) & (k < table.size) & (k == np.floor(k))
+        factors = np.interp(periods, points, values)
+
+        if self.interpolation == LOG_LINEAR:
+            factors = np.exp(factors)
+
+        factors = np.where(whole, table[np.where(whole, k, 0).astype(int)],
+                           factors)
+        beyond = periods > points[-1]
+
+        if beyond.any():
+            factors = np.where(beyond, self.interest_system.reduction_factor(
+                self.interest_rates[-1], periods), factors)
+
+        return factors
@@ -0,0 +1,46 @@
+#! python3
+# frozen.py - Base class for compact immutable value objects.
+
+
+class FrozenObject(object):
+    """Abstract class for immutable, hashable objects. Subclasses list
+    their fields in _fields and declare them as __slots__."""
+
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, *values):
+        """Initializes a FrozenObject instance."""
+        if len(values) != len(self._fields):
+            raise TypeError('{} takes {} values'.format(type(self).__name__,
+                                                       len(self._fields)))
+
+        for name, value in zip(self._fields, values):
+            object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError('{} is immutable'.format(type(self).__name__))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash((type(self), self._values()))
+
+    def __reduce__(self):
+        return type(self), self._values()
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(name, value) for name, value
+                           in zip(self._fields, self._values()))
+        return '{}({})'.format(type(self).__name__, fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{} is immutable'.format(type(self).__name__))
+
+    def _values(self):
+        """Returns the field values."""
+        return tuple(getattr(self, name) for name in self._fields)
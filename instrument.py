@@ -0,0 +1,152 @@
+#! python3
+# instrument.py - Opt-in call counting and timing of the public methods.
+
+from functools import wraps
+from time import perf_counter
+import threading
+
+from interest import AbstractInterest
+from interest import CompoundInterest
+from interest import SimpleInterest
+from progression import ArithmeticProgression
+from progression import GeometricProgression
+from progression import Progression
+from series import UniformSeriesPayment
+import series
+
+CLASSES = (AbstractInterest, SimpleInterest, CompoundInterest, Progression,
+           ArithmeticProgression, GeometricProgression, UniformSeriesPayment)
+
+# Probes telling whether a call was answered from a cache: a function
+# reading the instance state before and after the call, and whether an
+# unchanged state means a hit (True) or a miss (False).
+_PROBES = {
+    (Progression, 'nth_term'): (lambda self: self.terms.hits, False),
+    (UniformSeriesPayment, 'future_value'): (
+        lambda self: self._progression, True),
+    (UniformSeriesPayment, 'payment_by_future_value'): (
+        lambda self: self._progression, True),
+    (UniformSeriesPayment, 'payment_by_present_value'): (
+        lambda self: self._progression, True),
+    (UniformSeriesPayment, 'present_value'): (
+        lambda self: self._progression, True),
+}
+
+_callbacks = []
+_lock = threading.Lock()
+_originals = []
+_stats = {}
+
+
+def _record(name, elapsed, hit):
+    """Adds a call to the statistics and notifies the callbacks."""
+    with _lock:
+        stats = _stats.setdefault(name, {'calls': 0, 'hits': 0, 'misses': 0,
+                                         'time': 0.0})
+        stats['calls'] += 1
+        stats['time'] += elapsed
+
+        if hit is not None:
+            stats['hits' if hit else 'misses'] += 1
+
+    for callback in _callbacks:
+        callback(name, elapsed, hit)
+
+
+def _wrap(name, func, probe):
+    """Returns func wrapped to record its calls under name."""
+    if probe is None:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, perf_counter() - start, None)
+
+        return wrapper
+
+    state, hit_if_same = probe
+
+    @wraps(func)
+    def probed_wrapper(self, *args, **kwargs):
+        before = state(self)
+        start = perf_counter()
+
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            _record(name, elapsed, (state(self) == before) == hit_if_same)
+
+    return probed_wrapper
+
+
+def disable():
+    """Restores the original methods, removing any overhead."""
+    while _originals:
+        cls, attr, original = _originals.pop()
+        setattr(cls, attr, original)
+
+
+def enable():
+    """Wraps the public methods of the interest, progression and series
+    classes to count their calls, cache hits and misses and cumulative
+    time."""
+    if _originals:
+        return
+
+    for cls in CLASSES:
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_'):
+                continue
+
+            if isinstance(value, (classmethod, staticmethod)):
+                func = value.__func__
+                kind = type(value)
+            elif callable(value):
+                func = value
+                kind = None
+            else:
+                continue
+
+            if getattr(func, '__isabstractmethod__', False):
+                continue
+
+            name = '{}.{}'.format(cls.__name__, attr)
+            wrapper = _wrap(name, func, _PROBES.get((cls, attr)))
+            _originals.append((cls, attr, value))
+            setattr(cls, attr, kind(wrapper) if kind else wrapper)
+
+
+def is_enabled():
+    """Checks whether the instrumentation is enabled."""
+    return bool(_originals)
+
+
+def register(callback):
+    """Registers a callback called with the method name, elapsed time and
+    cache hit (True, False or None when unknown) of every call."""
+    _callbacks.append(callback)
+
+
+def reset():
+    """Clears the statistics."""
+    with _lock:
+        _stats.clear()
+
+
+def snapshot():
+    """Returns a copy of the statistics by method name, along with the
+    shared series factor cache statistics."""
+    with _lock:
+        result = {name: dict(stats) for name, stats in _stats.items()}
+
+    result['series.factor_cache'] = series.factor_cache.stats()
+    return result
+
+
+def unregister(callback):
+    """Unregisters a callback."""
+    _callbacks.remove(callback)
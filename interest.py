@@ -6,9 +6,19 @@ from abc import abstractmethod
 from itertools import zip_longest
 import math
 
+from arrays import is_array
+from arrays import np
+from arrays import require_numpy
+from solver import newton_bracketed
+
+BASIS_POINT = 1e-4
+
 
 class AbstractInterest(metaclass=ABCMeta):
-    """Abstract class for interest."""
+    """Abstract class for interest.
+
+    Every calculation also accepts NumPy arrays in place of numbers, with
+    the usual broadcasting rules, and then returns arrays."""
 
     @staticmethod
     @abstractmethod
@@ -57,33 +67,155 @@ class AbstractInterest(metaclass=ABCMeta):
         """Calculates the internal rate of return."""
         return cls.interest_rate(present_value, future_value, periods)
 
+    @classmethod
+    def internal_rate_return_batch(cls, cash_flows, periods=None, guess=None,
+                                   lower=-0.99, upper=1.0, tolerance=1e-10,
+                                   max_iterations=100):
+        """Calculates the internal rate of return of each row of a cash
+        flow matrix. Periods default to 0, 1, 2, ... and missing values are
+        filled as in net_present_value_batch. The root is bracketed by the
+        sign change nearest to 0, or to guess, which can be a previous
+        solution to warm start the solver. Returns the rates and a mask of
+        the rows that converged."""
+        require_numpy()
+
+        if periods is None:
+            flows, = _cash_flow_rows(cash_flows)
+            periods = np.arange(flows.shape[1])[np.newaxis]
+        else:
+            flows, periods = _cash_flow_rows(cash_flows, periods)
+
+        rows = max(flows.shape[0], periods.shape[0])
+        width = flows.shape[1]
+        flows = np.broadcast_to(flows, (rows, width))
+        periods = np.broadcast_to(periods, (rows, width))
+
+        def npv(rates, index):
+            f, n = flows[index], periods[index]
+            rates = rates[:, np.newaxis]
+            value = (f * cls.reduction_factor(rates, n)).sum(axis=1)
+            derivative = (f * cls.reduction_factor_derivative(rates, n)).sum(
+                axis=1)
+            return value, derivative
+
+        lower = np.full(rows, float(lower))
+        upper = np.full(rows, float(upper))
+        index = np.arange(rows)
+
+        for _ in range(64):
+            factors = cls.accumulation_factor(lower[:, np.newaxis], periods)
+            invalid = (factors <= 0).any(axis=1)
+
+            if not invalid.any():
+                break
+
+            lower[invalid] /= 2
+
+        start = 0.0 if guess is None else guess
+        start = np.clip(np.broadcast_to(np.asarray(start, dtype=float),
+                                        (rows,)), lower, upper)
+        lower, upper = _scan_bracket(npv, start, lower, upper*10**4)
+
+        return newton_bracketed(npv, lower, upper, guess=guess,
+                                tolerance=tolerance,
+                                max_iterations=max_iterations)
+
     @classmethod
     def net_present_value(cls, future_values, interest_rates, periods):
-        """Calculates the net present value from a cash flow."""
+        """Calculates the net present value from a cash flow. The interest
+        rates may also be a DiscountCurve."""
+        if _is_curve(interest_rates):
+            interest_rates = [interest_rates]
+
         npv = 0.0
-        prev_f = future_values[0]
-        prev_i = interest_rates[0]
-        prev_n = periods[0]
-
-        for f, i, n in zip_longest(future_values, interest_rates, periods):
-            f = f if f is not None else prev_f
-            i = i if i is not None else prev_i
-            n = n if n is not None else prev_n
+
+        for f, i, n in _cash_flows(future_values, interest_rates, periods):
             npv += cls.present_value(f, interest_rate=i, periods=n)
-            prev_f = f
-            prev_i = i
-            prev_n = n
 
         return npv
 
+    @classmethod
+    def net_present_value_batch(cls, future_values, interest_rates=None,
+                                periods=None):
+        """Calculates the net present value of each row of a cash flow
+        matrix. A single row of interest rates or periods is shared by
+        every cash flow. As in net_present_value, missing values (None or
+        NaN) are filled from the previous entry and each row ends at the
+        longest of its own flows, rates and periods. The interest rates
+        may also be a DiscountCurve, and the future values a CashFlowStore
+        holding its own rates and periods, which are then not given."""
+        require_numpy()
+
+        if hasattr(future_values, 'net_present_values'):
+            if interest_rates is not None or periods is not None:
+                raise TypeError('a cash flow store holds its own interest '
+                                'rates and periods')
+
+            return future_values.net_present_values(cls)
+
+        if interest_rates is None or periods is None:
+            raise TypeError('interest rates and periods are required')
+
+        if _is_curve(interest_rates):
+            f, n = _cash_flow_rows(future_values, periods)
+            return (f * interest_rates.discount_factor(n)).sum(axis=1)
+
+        f, n, i = _cash_flow_rows(future_values, periods, interest_rates)
+        return (f * cls.reduction_factor(i, n)).sum(axis=1)
+
+    @classmethod
+    def risk_measures(cls, future_values, interest_rates, periods):
+        """Calculates the net present value of a cash flow together with
+        its Macaulay and modified durations, convexity and DV01 in a
+        single pass. Missing values are filled from the previous entry,
+        as in net_present_value."""
+        if _is_curve(interest_rates):
+            raise TypeError('risk measures need interest rates, not a '
+                            'discount curve')
+
+        npv = weighted_periods = first = second = 0.0
+
+        for f, i, n in _cash_flows(future_values, interest_rates, periods):
+            factor, derivative, second_derivative = cls._reduction_factors(
+                i, n)
+            npv += f * factor
+            weighted_periods += n * f * factor
+            first += f * derivative
+            second += f * second_derivative
+
+        return _risk_measures(npv, weighted_periods, first, second)
+
+    @classmethod
+    def risk_measures_batch(cls, future_values, interest_rates, periods):
+        """Calculates the risk measures of each row of a cash flow matrix,
+        whose rows are filled and ended as in net_present_value_batch.
+        Each entry of the returned dictionary is an array with one value
+        per row."""
+        require_numpy()
+
+        if _is_curve(interest_rates):
+            raise TypeError('risk measures need interest rates, not a '
+                            'discount curve')
+
+        f, n, i = _cash_flow_rows(future_values, periods, interest_rates)
+        factor, derivative, second_derivative = cls._reduction_factors(i, n)
+        return _risk_measures((f * factor).sum(axis=1),
+                              (n * f * factor).sum(axis=1),
+                              (f * derivative).sum(axis=1),
+                              (f * second_derivative).sum(axis=1))
+
     @classmethod
     def present_value(cls, future_value, interest=None, interest_rate=None,
                       periods=None):
         """Calculates the present value from the future value and
-        interest or interest rate and number of periods."""
+        interest or interest rate (or DiscountCurve) and number of
+        periods."""
         if interest is not None:
             return future_value - interest
 
+        if _is_curve(interest_rate):
+            return future_value * interest_rate.discount_factor(periods)
+
         return future_value * cls.reduction_factor(interest_rate, periods)
 
     @classmethod
@@ -128,6 +260,10 @@ class AbstractInterest(metaclass=ABCMeta):
         interest rate according to expected inflation."""
         relation = (1 + effective_interest_rate)/(1 + real_interest_rate) - 1
 
+        if is_array(expected_inflation_rate, relation):
+            return np.where(expected_inflation_rate > relation,
+                            real_interest_rate, effective_interest_rate)
+
         if expected_inflation_rate > relation:
             return real_interest_rate
 
@@ -138,6 +274,139 @@ class AbstractInterest(metaclass=ABCMeta):
         """Calculates the reduction factor."""
         return 1 / cls.accumulation_factor(interest_rate, periods)
 
+    @staticmethod
+    @abstractmethod
+    def reduction_factor_derivative(interest_rate, periods, order=1):
+        """Calculates a derivative of the reduction factor with respect to
+        the interest rate."""
+        pass
+
+    @classmethod
+    def _reduction_factors(cls, interest_rate, periods):
+        """Returns the reduction factor with its first and second
+        derivatives with respect to the interest rate."""
+        return (cls.reduction_factor(interest_rate, periods),
+                cls.reduction_factor_derivative(interest_rate, periods),
+                cls.reduction_factor_derivative(interest_rate, periods, 2))
+
+
+def _is_curve(interest_rate):
+    """Checks whether an interest rate is a DiscountCurve."""
+    return hasattr(interest_rate, 'discount_factor')
+
+
+def _as_rows(values):
+    """Returns a 2-D float array, with short rows padded with NaN, and the
+    length of each row."""
+    try:
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        return values, np.full(values.shape[0], values.shape[1])
+    except ValueError:
+        rows = [np.asarray(row, dtype=float) for row in values]
+        width = max(row.size for row in rows)
+        values = np.full((len(rows), width), np.nan)
+
+        for k, row in enumerate(rows):
+            values[k, :row.size] = row
+
+        return values, np.array([row.size for row in rows])
+
+
+def _cash_flows(future_values, interest_rates, periods):
+    """Yields the future value, interest rate and periods of each flow of
+    a cash flow, which runs to the longest of the three. Missing values
+    (None) are filled from the previous entry."""
+    prev_f = future_values[0]
+    prev_i = interest_rates[0]
+    prev_n = periods[0]
+
+    for f, i, n in zip_longest(future_values, interest_rates, periods):
+        f = f if f is not None else prev_f
+        i = i if i is not None else prev_i
+        n = n if n is not None else prev_n
+        yield f, i, n
+        prev_f = f
+        prev_i = i
+        prev_n = n
+
+
+def _cash_flow_rows(future_values, *columns):
+    """Returns the cash flow matrix and the other matrices filled forward
+    and padded to a common width. As in net_present_value, each row runs
+    to the longest of its own flows and columns, and the flows beyond it
+    are zero."""
+    rows = [_as_rows(values) for values in (future_values,) + columns]
+    lengths = np.max(np.broadcast_arrays(*[size for _, size in rows]),
+                     axis=0)
+    matrices = _pad_columns([_fill_missing(values) for values, _ in rows])
+    inside = np.arange(matrices[0].shape[1]) < lengths[:, np.newaxis]
+    matrices[0] = np.where(inside, matrices[0], 0.0)
+    return matrices
+
+
+def _fill_missing(values):
+    """Fills the NaN entries of a 2-D array from the previous entry of the
+    same row."""
+    missing = np.isnan(values)
+
+    if missing.any():
+        index = np.where(missing, 0, np.arange(values.shape[1]))
+        np.maximum.accumulate(index, axis=1, out=index)
+        values = np.take_along_axis(values, index, axis=1)
+
+    return values
+
+
+def _scan_bracket(func, start, lower, upper):
+    """Returns the bracket of the sign change of each equation nearest to
+    start, scanning outward on a 1-2-5 grid of steps up to upper and down
+    to lower. Equations without a sign change keep lower and upper."""
+    steps = np.array([0.0] + [m * 10.0**e for e in range(-2, 5)
+                              for m in (1, 2, 5)])
+    index = np.arange(start.size)
+    brackets = []
+
+    for points in (np.minimum(start[:, np.newaxis] + steps,
+                              upper[:, np.newaxis]),
+                   np.maximum(start[:, np.newaxis] - steps,
+                              lower[:, np.newaxis])):
+        with np.errstate(all='ignore'):
+            signs = np.sign(np.column_stack(
+                [func(points[:, j], index)[0] for j in range(steps.size)]))
+
+        change = signs[:, :-1] * signs[:, 1:] <= 0
+        first = np.where(change.any(axis=1), change.argmax(axis=1),
+                         steps.size)
+        j = np.minimum(first, steps.size - 2)
+        brackets.append((first, np.sort(np.column_stack(
+            [points[index, j], points[index, j + 1]]), axis=1)))
+
+    (up, up_bracket), (down, down_bracket) = brackets
+    bracket = np.where((up <= down)[:, np.newaxis], up_bracket,
+                       down_bracket)
+    found = np.minimum(up, down) < steps.size
+    return (np.where(found, bracket[:, 0], lower),
+            np.where(found, bracket[:, 1], upper))
+
+
+def _pad_columns(columns):
+    """Pads every matrix to the widest one by repeating its last column."""
+    width = max(column.shape[1] for column in columns)
+    return [np.pad(column, ((0, 0), (0, width - column.shape[1])),
+                   mode='edge') for column in columns]
+
+
+def _risk_measures(npv, weighted_periods, first, second):
+    """Builds the risk measures from the net present value, its
+    period-weighted sum and its first and second rate derivatives."""
+    return {
+        'net_present_value': npv,
+        'macaulay_duration': weighted_periods / npv,
+        'modified_duration': -first / npv,
+        'convexity': second / npv,
+        'dv01': -first * BASIS_POINT,
+    }
+
 
 class SimpleInterest(AbstractInterest):
     """Class for simple interest."""
@@ -147,6 +416,13 @@ class SimpleInterest(AbstractInterest):
         """Calculates the accumulation factor."""
         return 1 + (interest_rate*periods)
 
+    @staticmethod
+    def reduction_factor_derivative(interest_rate, periods, order=1):
+        """Calculates a derivative of the reduction factor with respect to
+        the interest rate."""
+        coefficient = math.factorial(order) * (-periods)**order
+        return coefficient / (1 + (interest_rate*periods))**(order + 1)
+
     @classmethod
     def equivalent_future_value(cls, future_values, interest_rate, from_periods,
                                 to_periods):
@@ -196,6 +472,26 @@ class CompoundInterest(AbstractInterest):
         """Calculates the accumulation factor."""
         return (1 + interest_rate) ** periods
 
+    @staticmethod
+    def reduction_factor_derivative(interest_rate, periods, order=1):
+        """Calculates a derivative of the reduction factor with respect to
+        the interest rate."""
+        coefficient = 1
+
+        for k in range(order):
+            coefficient = coefficient * -(periods + k)
+
+        return coefficient * (1 + interest_rate)**(-periods - order)
+
+    @classmethod
+    def _reduction_factors(cls, interest_rate, periods):
+        """Returns the reduction factor with its first and second
+        derivatives, reusing the factor for both."""
+        factor = cls.reduction_factor(interest_rate, periods)
+        base = 1 + interest_rate
+        return (factor, -periods * factor / base,
+                periods * (periods + 1) * factor / base**2)
+
     @classmethod
     def interest_rate(cls, present_value, future_value, periods):
         """Calculates the interest rate."""
@@ -216,4 +512,7 @@ class CompoundInterest(AbstractInterest):
         """Calculates the number of periods."""
         interest_rate_period = cls.interest_rate_period(
             present_value, future_value=future_value)
+        if is_array(interest_rate_period, interest_rate):
+            return np.log(1 + interest_rate_period) / np.log(1 + interest_rate)
+
         return math.log((1 + interest_rate_period), (1 + interest_rate))
@@ -0,0 +1,315 @@
+#! python3
+# money.py - Exact money amounts as integers of minor units.
+
+from decimal import Decimal
+from decimal import ROUND_CEILING
+from decimal import ROUND_DOWN
+from decimal import ROUND_FLOOR
+from decimal import ROUND_HALF_DOWN
+from decimal import ROUND_HALF_EVEN
+from decimal import ROUND_HALF_UP
+from decimal import ROUND_UP
+from fractions import Fraction
+
+from arrays import require_numpy
+from interest import CompoundInterest
+from interest import _cash_flow_rows
+from interest import _cash_flows
+from series import PRICE
+from series import ScheduleRow
+from series import UniformSeriesPayment
+
+ROUNDINGS = (ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, ROUND_HALF_DOWN,
+             ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP)
+
+# Relative error allowed for a float product in a batch; products closer
+# than this to a rounding boundary are recomputed exactly.
+_ROUNDING_MARGIN = 1e-11
+
+
+class MoneyContext(object):
+    """Class for calculations over amounts stored as integers of minor
+    units (cents by default). Every calculation multiplies an amount by
+    an exact fractional factor, built from the decimal representation of
+    the interest rate (0.01 is 1/100), and rounds the product once to a
+    minor unit with the context rounding rule, which uses the decimal
+    module names. Factors are exact for whole periods. Batches multiply
+    by float factors and recompute exactly the products that fall too
+    close to a rounding boundary, so they match the scalar results."""
+
+    def __init__(self, minor_units=2, rounding=ROUND_HALF_EVEN,
+                 interest_system=CompoundInterest):
+        """Initializes a MoneyContext instance."""
+        if rounding not in ROUNDINGS:
+            raise TypeError('rounding must be one of ' + ', '.join(ROUNDINGS))
+
+        self.minor_units = minor_units
+        self.rounding = rounding
+        self.interest_system = interest_system
+        self._scale = 10 ** minor_units
+
+    def _divide(self, numerator, denominator):
+        """Divides two integers, rounding the quotient with the rounding
+        rule."""
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+
+        quotient, remainder = divmod(numerator, denominator)
+
+        if remainder == 0 or self.rounding == ROUND_FLOOR:
+            return quotient
+
+        negative = numerator < 0
+        away = quotient if negative else quotient + 1
+        toward = quotient + 1 if negative else quotient
+
+        if self.rounding == ROUND_CEILING:
+            return quotient + 1
+        if self.rounding == ROUND_DOWN:
+            return toward
+        if self.rounding == ROUND_UP:
+            return away
+        if 2*remainder < denominator:
+            return quotient
+        if 2*remainder > denominator:
+            return quotient + 1
+        if self.rounding == ROUND_HALF_EVEN:
+            return quotient + quotient % 2
+        if self.rounding == ROUND_HALF_UP:
+            return away
+
+        return toward
+
+    @staticmethod
+    def _exact(interest_rate, periods):
+        """Returns the interest rate as the exact fraction of its decimal
+        representation and whole periods as an int."""
+        if isinstance(interest_rate, (int, Decimal, Fraction)):
+            interest_rate = Fraction(interest_rate)
+        else:
+            interest_rate = Fraction(str(interest_rate))
+
+        if float(periods).is_integer():
+            periods = int(periods)
+
+        return interest_rate, periods
+
+    def _multiply(self, units, factor):
+        """Multiplies an amount by a factor exactly and rounds the product
+        to a minor unit. NumPy integers are converted first so the product
+        cannot overflow."""
+        factor = Fraction(factor)
+        return self._divide(int(units) * factor.numerator,
+                            factor.denominator)
+
+    def _round_batch(self, method, products, *columns):
+        """Rounds float products to minor units with the rounding rule.
+        Products within the float error of a rounding boundary are
+        recomputed with the exact scalar method from the matching items of
+        the columns."""
+        np = require_numpy()
+        products, *columns = np.broadcast_arrays(products, *columns)
+
+        with np.errstate(invalid='ignore'):
+            fraction = products - np.floor(products)
+            margin = (np.abs(products) + 1) * _ROUNDING_MARGIN
+            safe = ((np.minimum(fraction, 1 - fraction) >= margin)
+                    & (np.abs(fraction - 0.5) >= margin))
+
+        result = self._round_array(np.where(safe, products, 0.0))
+
+        for index in map(tuple, np.argwhere(~safe)):
+            result[index] = method(*[column[index] for column in columns])
+
+        return result
+
+    def _round_array(self, values):
+        """Rounds an array of floats to integers with the rounding
+        rule."""
+        np = require_numpy()
+        magnitude = np.abs(values)
+
+        if self.rounding == ROUND_HALF_EVEN:
+            rounded = np.rint(values)
+        elif self.rounding == ROUND_FLOOR:
+            rounded = np.floor(values)
+        elif self.rounding == ROUND_CEILING:
+            rounded = np.ceil(values)
+        elif self.rounding == ROUND_DOWN:
+            rounded = np.trunc(values)
+        elif self.rounding == ROUND_UP:
+            rounded = np.sign(values) * np.ceil(magnitude)
+        elif self.rounding == ROUND_HALF_UP:
+            rounded = np.sign(values) * np.floor(magnitude + 0.5)
+        else:
+            rounded = np.sign(values) * np.ceil(magnitude - 0.5)
+
+        return rounded.astype(np.int64)
+
+    def _schedule_rows(self, units, interest_rate, periods, first_payment,
+                       payment=None):
+        """Yields the rows of a schedule with a fixed payment, or with a
+        fixed amortization when payment is None. The last row settles the
+        remaining balance."""
+        units = int(units)
+        interest_rate, _ = self._exact(interest_rate, periods)
+        amortization = self._divide(units, periods)
+        balance = units
+
+        if first_payment == 0:
+            paid = payment if payment is not None else amortization
+            balance -= paid
+            yield ScheduleRow(0, paid, 0, paid, balance)
+            periods -= 1
+
+        for period in range(1, periods + 1):
+            interest = self._multiply(balance, interest_rate)
+
+            if period == periods:
+                amortization = balance
+            elif payment is not None:
+                amortization = payment - interest
+
+            balance -= amortization
+            yield ScheduleRow(period, amortization + interest, interest,
+                              amortization, balance)
+
+    def from_minor(self, units):
+        """Converts minor units to an exact Decimal amount."""
+        return Decimal(units).scaleb(-self.minor_units)
+
+    def future_value(self, units, interest_rate, periods):
+        """Calculates the future value of an amount."""
+        return self._multiply(units, self.interest_system.accumulation_factor(
+            *self._exact(interest_rate, periods)))
+
+    def future_value_batch(self, units, interest_rates, periods):
+        """Calculates the future values of an int64 array of amounts."""
+        factors = self.interest_system.accumulation_factor(interest_rates,
+                                                           periods)
+        return self._round_batch(self.future_value, units * factors, units,
+                                 interest_rates, periods)
+
+    def net_present_value(self, units, interest_rates, periods):
+        """Calculates the net present value of a cash flow, rounding each
+        discounted flow to a minor unit. Missing values are filled from
+        the previous entry, as in AbstractInterest.net_present_value."""
+        npv = 0
+
+        for f, i, n in _cash_flows(units, interest_rates, periods):
+            npv += self.present_value(f, i, n)
+
+        return npv
+
+    def net_present_value_batch(self, units, interest_rates, periods):
+        """Calculates the net present value of each row of an int64 cash
+        flow matrix, rounding each discounted flow to a minor unit. Missing
+        values and ragged rows are handled as in
+        AbstractInterest.net_present_value_batch."""
+        require_numpy()
+        units, periods, interest_rates = _cash_flow_rows(units, periods,
+                                                         interest_rates)
+        factors = self.interest_system.reduction_factor(interest_rates,
+                                                        periods)
+        return self._round_batch(self.present_value, units * factors, units,
+                                 interest_rates, periods).sum(axis=1)
+
+    def payment_by_future_value(self, units, interest_rate, periods,
+                                first_payment=1):
+        """Calculates the fixed payment of a uniform series according to
+        the future value."""
+        interest_rate, periods = self._exact(interest_rate, periods)
+        return self._multiply(units, UniformSeriesPayment._sinking_fund_factor(
+            interest_rate, periods, first_payment, self.interest_system))
+
+    def payment_by_present_value(self, units, interest_rate, periods,
+                                 first_payment=1):
+        """Calculates the fixed payment of a uniform series according to
+        the present value."""
+        interest_rate, periods = self._exact(interest_rate, periods)
+        return self._multiply(units,
+                              UniformSeriesPayment._capital_recovery_factor(
+                                  interest_rate, periods, first_payment,
+                                  self.interest_system))
+
+    def payment_by_present_value_batch(self, units, interest_rates, periods,
+                                       first_payments=1):
+        """Calculates the fixed payments of uniform series according to an
+        int64 array of present values."""
+        factors = UniformSeriesPayment._capital_recovery_factor(
+            interest_rates, periods, first_payments, self.interest_system)
+        return self._round_batch(self.payment_by_present_value,
+                                 units * factors, units, interest_rates,
+                                 periods, first_payments)
+
+    def present_value(self, units, interest_rate, periods):
+        """Calculates the present value of an amount."""
+        return self._multiply(units, self.interest_system.reduction_factor(
+            *self._exact(interest_rate, periods)))
+
+    def present_value_batch(self, units, interest_rates, periods):
+        """Calculates the present values of an int64 array of amounts."""
+        factors = self.interest_system.reduction_factor(interest_rates,
+                                                        periods)
+        return self._round_batch(self.present_value, units * factors, units,
+                                 interest_rates, periods)
+
+    def schedule(self, units, interest_rate, periods, first_payment=1,
+                 system=PRICE):
+        """Returns an iterator over the amortization schedule of a loan in
+        minor units. Interest is rounded every period and the last row
+        settles the balance to exactly zero."""
+        UniformSeriesPayment._check_system(system)
+        payment = None
+
+        if system == PRICE:
+            payment = self.payment_by_present_value(units, interest_rate,
+                                                    periods, first_payment)
+
+        return self._schedule_rows(units, interest_rate, periods,
+                                   first_payment, payment)
+
+    def to_minor(self, amount):
+        """Converts an amount (number, string or Decimal) to minor units,
+        rounding with the rounding rule."""
+        if isinstance(amount, float):
+            amount = repr(amount)
+
+        return int(Decimal(amount).scaleb(self.minor_units).quantize(
+            1, rounding=self.rounding))
+
+
+if __name__ == '__main__':
+    import random
+    from decimal import localcontext
+
+    from arrays import np
+
+    random.seed(0)
+    context = MoneyContext()
+    cases = [(random.randint(-10**7, 10**7), random.randint(0, 2000) / 10000,
+              random.randint(0, 120)) for _ in range(10000)]
+    mismatches = 0
+
+    with localcontext() as decimal_context:
+        decimal_context.prec = 2000
+
+        for units, rate, periods in cases:
+            factor = (1 + Decimal(str(rate)))**periods
+            mismatches += (Decimal(units) * factor).quantize(
+                1, rounding=context.rounding) != context.future_value(
+                    units, rate, periods)
+            mismatches += (Decimal(units) / factor).quantize(
+                1, rounding=context.rounding) != context.present_value(
+                    units, rate, periods)
+
+    if np is not None:
+        units, rates, periods = [np.array(column) for column in zip(*cases)]
+        mismatches += (context.future_value_batch(units, rates, periods) != [
+            context.future_value(*case) for case in cases]).sum()
+        mismatches += (context.present_value_batch(units, rates, periods) != [
+            context.present_value(*case) for case in cases]).sum()
+
+    print(context.future_value(4850, 0.01, 1))
+    print(context.present_value(4898, 0.01, 1))
+    print('mismatches against Decimal:', mismatches)
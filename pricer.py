@@ -0,0 +1,98 @@
+#! python3
+# pricer.py - Chunked batch pricing of loan files.
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import csv
+
+from arrays import require_numpy
+from series import UniformSeriesPayment
+
+INPUT_COLUMNS = ('interest_rate', 'periods', 'first_payment', 'present_value')
+OUTPUT_COLUMNS = ('payment', 'future_value', 'accumulation_factor',
+                  'capital_recovery_factor', 'present_worth_factor',
+                  'sinking_fund_factor')
+
+
+def price_chunk(chunk):
+    """Prices a chunk of loans given as a dict of input column arrays.
+    Returns the chunk with the output columns added."""
+    priced = dict(chunk)
+    priced.update(UniformSeriesPayment.price_batch(
+        *[chunk[name] for name in INPUT_COLUMNS]))
+    return priced
+
+
+def price_chunks(chunks, processes=None):
+    """Prices an iterable of column chunks, such as those read by
+    read_csv or converted from Parquet record batches, yielding the priced
+    chunks in order. With processes, chunks are priced in a process pool
+    with at most twice that many chunks in flight."""
+    if not processes:
+        yield from map(price_chunk, chunks)
+        return
+
+    chunks = iter(chunks)
+
+    with ProcessPoolExecutor(processes) as executor:
+        pending = deque(executor.submit(price_chunk, chunk)
+                        for chunk in islice(chunks, 2 * processes))
+
+        while pending:
+            priced = pending.popleft().result()
+
+            for chunk in islice(chunks, 1):
+                pending.append(executor.submit(price_chunk, chunk))
+
+            yield priced
+
+
+def price_file(input_path, output_path, chunk_size=100000, processes=None):
+    """Prices a CSV loan file chunk by chunk, writing the results to
+    another CSV file as they are computed. Returns the number of loans."""
+    return write_csv(price_chunks(read_csv(input_path, chunk_size),
+                                  processes), output_path)
+
+
+def read_csv(path, chunk_size=100000):
+    """Yields chunks of at most chunk_size loans from a CSV file with a
+    header, as dicts of the input column arrays."""
+    np = require_numpy()
+
+    with open(path, newline='') as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader)
+
+        try:
+            index = [header.index(name) for name in INPUT_COLUMNS]
+        except ValueError:
+            raise ValueError('CSV file should contain the columns '
+                             + ', '.join(INPUT_COLUMNS)) from None
+
+        while True:
+            rows = list(islice(reader, chunk_size))
+
+            if not rows:
+                break
+
+            values = np.asarray(rows)[:, index].astype(float)
+            yield dict(zip(INPUT_COLUMNS, values.T))
+
+
+def write_csv(chunks, path):
+    """Writes priced chunks to a CSV file as they arrive. Returns the
+    number of rows written."""
+    np = require_numpy()
+    columns = INPUT_COLUMNS + OUTPUT_COLUMNS
+    rows = 0
+
+    with open(path, 'w', newline='') as csv_file:
+        csv_file.write(','.join(columns) + '\n')
+
+        for chunk in chunks:
+            values = np.column_stack([chunk[name] for name in columns])
+            np.savetxt(csv_file, values, fmt='%.17g', delimiter=',')
+            rows += len(values)
+
+    return rows
@@ -3,15 +3,35 @@
 
 from abc import ABCMeta
 from abc import abstractmethod
+from array import array
+from itertools import islice
+
+from arrays import is_array
+from arrays import np
+from cache import LRUCache
+from frozen import FrozenObject
 
 
 class Progression(metaclass=ABCMeta):
     """Abstract class for progressions."""
 
-    def __init__(self, initial_term, ratio):
-        """Initializes a Progression instance."""
+    def __init__(self, initial_term, ratio, cache_size=None):
+        """Initializes a Progression instance. The computed terms are kept
+        in a cache of at most cache_size terms (None for unbounded, 0 to
+        disable it), created on first use."""
+        self.initial_term = initial_term
         self.ratio = ratio
-        self.terms = {1: initial_term}
+        self._cache_size = cache_size
+        self._terms = None
+
+    @property
+    def terms(self):
+        """The cache of computed terms."""
+        if self._terms is None:
+            self._terms = LRUCache(self._cache_size)
+            self._terms[1] = self.initial_term
+
+        return self._terms
 
     @staticmethod
     def _check_index(n):
@@ -19,11 +39,85 @@ class Progression(metaclass=ABCMeta):
         if n < 1:
             raise IndexError('index must be greater than or equal to 1')
 
+    @staticmethod
+    def _check_step(step):
+        """If the step is not allowed, throws ValueError exception."""
+        if step < 1:
+            raise ValueError('step must be greater than or equal to 1')
+
+    @classmethod
+    def _fits(cls, terms, ratio, tolerance):
+        """Checks whether every ratio between consecutive terms is within
+        the tolerance of the given ratio. NumPy arrays are checked in a
+        single vectorized pass; other sequences keep exact arithmetic."""
+        if not is_array(terms):
+            for term_1, term_2 in zip(terms, islice(terms, 1, None)):
+                if not abs(cls.get_ratio(term_1, term_2) - ratio) <= tolerance:
+                    return False
+
+            return True
+
+        terms = np.asarray(terms, dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = cls.get_ratio(terms[:-1], terms[1:])
+
+        return bool((np.abs(ratios - ratio) <= tolerance).all())
+
+    @abstractmethod
+    def _iter_terms(self, start, step):
+        """Yields the terms from start forever by recurrence."""
+        pass
+
     @abstractmethod
     def _nth_term(self, n):
         """Calculates the nth term."""
         pass
 
+    @classmethod
+    def fit(cls, sequence, tolerance=1e-10):
+        """Returns the initial term and the ratio of a sequence that is a
+        progression of this class, or None otherwise. NumPy arrays are
+        checked in a single vectorized pass."""
+        if not is_array(sequence):
+            return cls.fit_iter(sequence, tolerance)
+
+        if sequence.size < 3:
+            raise TypeError('sequence should contain at least 3 items')
+
+        ratio = cls.get_ratio(sequence[0], sequence[1])
+
+        if not cls._fits(sequence, ratio, tolerance):
+            return None
+
+        return sequence[0], ratio
+
+    @classmethod
+    def fit_iter(cls, iterable, tolerance=1e-10, chunk_size=4096):
+        """Returns the initial term and the ratio of an iterable that is a
+        progression of this class, or None otherwise. The items are read
+        in chunks, stopping at the first chunk that breaks the
+        progression."""
+        iterator = iter(iterable)
+        chunk = list(islice(iterator, 3))
+
+        if len(chunk) < 3:
+            raise TypeError('sequence should contain at least 3 items')
+
+        initial_term = chunk[0]
+        ratio = cls.get_ratio(chunk[0], chunk[1])
+        previous = chunk[1]
+        chunk = chunk[2:]
+
+        while chunk:
+            if not cls._fits([previous] + chunk, ratio, tolerance):
+                return None
+
+            previous = chunk[-1]
+            chunk = list(islice(iterator, chunk_size))
+
+        return initial_term, ratio
+
     @staticmethod
     @abstractmethod
     def get_ratio(term_1, term_2):
@@ -35,6 +129,19 @@ class Progression(metaclass=ABCMeta):
         """Calculates the sum of n first terms."""
         pass
 
+    def iter_terms(self, start=1, stop=None, step=1):
+        """Returns an iterator over the terms from start up to, but not
+        including, stop (forever if stop is None). The terms are computed
+        by recurrence and are not cached."""
+        self._check_index(start)
+        self._check_step(step)
+        terms = self._iter_terms(start, step)
+
+        if stop is None:
+            return terms
+
+        return islice(terms, len(range(start, stop, step)))
+
     def n_first_terms(self, n):
         """Returns the n first terms."""
         self._check_index(n)
@@ -52,7 +159,21 @@ class Progression(metaclass=ABCMeta):
         try:
             return self.terms[n]
         except KeyError:
-            return self._nth_term(n)
+            term = self._nth_term(n)
+            self.terms[n] = term
+            return term
+
+    def terms_array(self, start, stop, step=1):
+        """Returns the terms from start up to, but not including, stop in
+        a contiguous block: a NumPy array if available, otherwise an
+        array.array of doubles. The terms are not cached."""
+        self._check_index(start)
+        self._check_step(step)
+
+        if np is None:
+            return array('d', self.iter_terms(start, stop, step))
+
+        return self._nth_term(np.arange(start, stop, step, dtype=float))
 
 
 class ArithmeticProgression(Progression):
@@ -66,30 +187,25 @@ class ArithmeticProgression(Progression):
     @staticmethod
     def is_arithmetic(sequence, tolerance=1e-10):
         """Checks whether a sequence is a arithmetic progression."""
-        sequence_size = len(sequence)
-
-        if sequence_size < 3:
-            raise TypeError('sequence should contain at least 3 items')
-
-        diff = sequence[1] - sequence[0]
-
-        for i in range(2, sequence_size):
-            curr_diff = sequence[i] - sequence[i - 1]
+        return ArithmeticProgression.fit(sequence, tolerance) is not None
 
-            if abs(curr_diff - diff) > tolerance:
-                return False
+    def _iter_terms(self, start, step):
+        """Yields the terms from start forever by recurrence."""
+        term = self._nth_term(start)
+        difference = step * self.ratio
 
-        return True
+        while True:
+            yield term
+            term += difference
 
     def _nth_term(self, n):
         """Calculates the nth term."""
-        self.terms[n] = self.terms[1] + (n - 1)*self.ratio
-        return self.terms[n]
+        return self.initial_term + (n - 1)*self.ratio
 
     def sum_first_terms(self, n):
         """Calculates the sum of n first terms."""
         self._check_index(n)
-        return n*(self.terms[1] + self.nth_term(n)) / 2
+        return n*(self.initial_term + self.nth_term(n)) / 2
 
 
 class GeometricProgression(Progression):
@@ -103,31 +219,65 @@ class GeometricProgression(Progression):
     @staticmethod
     def is_geometric(sequence, tolerance=1e-10):
         """Checks whether a sequence is a geometric progression."""
-        sequence_size = len(sequence)
+        return GeometricProgression.fit(sequence, tolerance) is not None
 
-        if sequence_size < 3:
-            raise TypeError('sequence should contain at least 3 items')
-
-        ratio = sequence[1] / sequence[0]
-
-        for i in range(2, sequence_size):
-            curr_ratio = sequence[i] / sequence[i - 1]
-
-            if abs(curr_ratio - ratio) > tolerance:
-                return False
+    def _iter_terms(self, start, step):
+        """Yields the terms from start forever by recurrence."""
+        term = self._nth_term(start)
+        factor = self.ratio ** step
 
-        return True
+        while True:
+            yield term
+            term *= factor
 
     def _nth_term(self, n):
         """Calculates the nth term."""
-        self.terms[n] = self.terms[1]*(self.ratio**(n - 1))
-        return self.terms[n]
+        return self.initial_term*(self.ratio**(n - 1))
 
     def sum_first_terms(self, n):
         """Calculates the sum of n first terms."""
         self._check_index(n)
 
         if self.ratio == 1:
-            return n*self.terms[1]
+            return n*self.initial_term
+
+        return self.initial_term*(1 - self.ratio**n) / (1 - self.ratio)
+
+
+class FrozenProgression(FrozenObject):
+    """Abstract class for immutable progressions, without a term cache."""
+
+    __slots__ = ('initial_term', 'ratio')
+    _fields = __slots__
+    _check_index = staticmethod(Progression._check_index)
+    _check_step = staticmethod(Progression._check_step)
+    iter_terms = Progression.iter_terms
+    terms_array = Progression.terms_array
+
+    def n_first_terms(self, n):
+        """Returns the n first terms."""
+        self._check_index(n)
+        return [self._nth_term(i) for i in range(1, (n + 1))]
+
+    def nth_term(self, n):
+        """Returns the nth term."""
+        self._check_index(n)
+        return self._nth_term(n)
+
+
+class FrozenArithmeticProgression(FrozenProgression):
+    """Class for immutable arithmetic progression."""
+
+    __slots__ = ()
+    _iter_terms = ArithmeticProgression._iter_terms
+    _nth_term = ArithmeticProgression._nth_term
+    sum_first_terms = ArithmeticProgression.sum_first_terms
+
+
+class FrozenGeometricProgression(FrozenProgression):
+    """Class for immutable geometric progression."""
 
-        return self.terms[1]*(1 - self.ratio**n) / (1 - self.ratio)
+    __slots__ = ()
+    _iter_terms = GeometricProgression._iter_terms
+    _nth_term = GeometricProgression._nth_term
+    sum_first_terms = GeometricProgression.sum_first_terms
@@ -0,0 +1,125 @@
+#! python3
+# scenario.py - Monte Carlo valuation under simulated interest rate paths.
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+from arrays import require_numpy
+from interest import CompoundInterest
+
+
+class ScenarioEngine(object):
+    """Class for valuing a cash flow under interest rate scenarios, given
+    as a matrix of per-period compound interest rates with one row per
+    scenario and one column per period."""
+
+    def __init__(self, cash_flows):
+        """Initializes a ScenarioEngine instance. The cash flows are paid
+        at the end of periods 1, 2, ..., one per column of the rates."""
+        np = require_numpy()
+        self.cash_flows = np.asarray(cash_flows, dtype=float)
+
+    def _check_rates(self, rates):
+        """If the rates do not have one column per cash flow, throws
+        ValueError exception."""
+        if rates.ndim != 2 or rates.shape[1] != self.cash_flows.size:
+            raise ValueError('rates should have one column per cash flow')
+
+    @staticmethod
+    def discount_factors(rates):
+        """Calculates the path-dependent discount factors of each
+        scenario, chaining the one period reduction factors."""
+        np = require_numpy()
+        return np.cumprod(CompoundInterest.reduction_factor(rates, 1), axis=1)
+
+    def net_present_values(self, rates, processes=None, chunk_size=10000):
+        """Calculates the net present value under each scenario. With
+        processes, the scenarios are split across a process pool that reads
+        the rates from and writes the values to shared memory."""
+        np = require_numpy()
+        rates = np.ascontiguousarray(rates, dtype=float)
+        self._check_rates(rates)
+
+        if not processes:
+            return _net_present_values(rates, self.cash_flows, chunk_size)
+
+        shared_rates = SharedMemory(create=True, size=max(rates.nbytes, 1))
+        shared_values = SharedMemory(create=True,
+                                     size=max(rates.shape[0] * 8, 1))
+
+        try:
+            np.ndarray(rates.shape, buffer=shared_rates.buf)[:] = rates
+            bounds = range(0, rates.shape[0], chunk_size)
+
+            with ProcessPoolExecutor(processes) as executor:
+                futures = [executor.submit(
+                    _value_shared_scenarios, shared_rates.name,
+                    shared_values.name, rates.shape, self.cash_flows, start,
+                    start + chunk_size) for start in bounds]
+
+                for future in futures:
+                    future.result()
+
+            values = np.ndarray(rates.shape[0], buffer=shared_values.buf)
+            return values.copy()
+        finally:
+            shared_rates.close()
+            shared_rates.unlink()
+            shared_values.close()
+            shared_values.unlink()
+
+    def run(self, rates, percentiles=(1, 5, 50, 95, 99), processes=None,
+            chunk_size=10000):
+        """Values the cash flow under every scenario. Returns the net
+        present values with their mean, standard deviation and
+        percentiles."""
+        np = require_numpy()
+        values = self.net_present_values(rates, processes, chunk_size)
+        return {'net_present_values': values, 'mean': values.mean(),
+                'std': values.std(),
+                'percentiles': dict(zip(percentiles,
+                                        np.percentile(values, percentiles)))}
+
+
+def simulate_rates(initial_rate, periods, scenarios, volatility, drift=0.0,
+                   seed=None):
+    """Simulates per-period interest rate paths as a lognormal random walk
+    from the initial rate. The same seed gives the same paths."""
+    np = require_numpy()
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((scenarios, periods))
+    steps = (drift - volatility**2/2) + volatility*shocks
+    return initial_rate * np.exp(np.cumsum(steps, axis=1))
+
+
+def _net_present_values(rates, cash_flows, chunk_size):
+    """Calculates the net present value under each scenario, a chunk of
+    scenarios at a time."""
+    np = require_numpy()
+    values = np.empty(rates.shape[0])
+
+    for start in range(0, rates.shape[0], chunk_size):
+        stop = start + chunk_size
+        values[start:stop] = (ScenarioEngine.discount_factors(
+            rates[start:stop]) @ cash_flows)
+
+    return values
+
+
+def _value_shared_scenarios(rates_name, values_name, shape, cash_flows,
+                            start, stop):
+    """Values the scenarios from start to stop, reading the rates from and
+    writing the values to shared memory."""
+    np = require_numpy()
+    shared_rates = SharedMemory(name=rates_name)
+    shared_values = SharedMemory(name=values_name)
+
+    try:
+        rates = np.ndarray(shape, buffer=shared_rates.buf)
+        values = np.ndarray(shape[0], buffer=shared_values.buf)
+        values[start:stop] = _net_present_values(rates[start:stop],
+                                                 cash_flows, stop - start)
+        del rates, values
+    finally:
+        shared_rates.close()
+        shared_values.close()
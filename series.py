@@ -1,24 +1,64 @@
 #! python3
 # series.py - Uniform series of payments.
 
+from collections import namedtuple
+from contextlib import nullcontext
+import math
+
+from arrays import np
+from arrays import require_numpy
+from cache import LRUCache
+from frozen import FrozenObject
+from interest import BASIS_POINT
 from interest import CompoundInterest
+from progression import ArithmeticProgression
 from progression import GeometricProgression
+from solver import newton_bracketed
+
+PRICE = 'price'
+SAC = 'sac'
+
+# Series factors shared by every UniformSeriesPayment, keyed by factor,
+# interest rate, periods, first payment and interest system.
+factor_cache = LRUCache(4096, thread_safe=True)
+
+ScheduleRow = namedtuple('ScheduleRow',
+                         'period payment interest amortization balance')
 
 
 class UniformSeriesPayment(object):
-    """Class for uniform series of payments."""
+    """Class for uniform series of payments. The series may be deferred by
+    a number of periods, be a perpetuity (periods of math.inf) or have
+    payments growing at a constant rate; all of them are evaluated in
+    closed form."""
 
-    def __init__(self, interest_rate, periods, first_payment):
+    def __init__(self, interest_rate, periods, first_payment, deferral=0,
+                 growth_rate=0):
         """Initializes a UniformSeriesPayment instance."""
         if first_payment not in (0, 1):
             raise TypeError('first payment must be 0 or 1')
 
+        if deferral < 0:
+            raise TypeError('deferral must be greater than or equal to 0')
+
+        if periods == math.inf and growth_rate >= interest_rate:
+            raise TypeError('perpetuity requires an interest rate greater '
+                            'than the growth rate')
+
         self.interest_rate = interest_rate
-        self.periods = periods # TODO: perpetuity?
-        self.first_payment = first_payment # TODO: deferred?
+        self.periods = periods
+        self.first_payment = first_payment
+        self.deferral = deferral
+        self.growth_rate = growth_rate
         self._interest_system = CompoundInterest
+        self._horizon = periods + deferral
         self._progression_ratio = self._interest_system.reduction_factor(
             interest_rate, 1)
+
+        if growth_rate != 0:
+            self._progression_ratio *= (
+                self._interest_system.accumulation_factor(growth_rate, 1))
+
         self._future_value = None
         self._payment = None
         self._present_value = None
@@ -26,18 +66,30 @@ class UniformSeriesPayment(object):
 
     def accumulation_factor(self):
         """Calculates the accumulation factor."""
+        self._check_finite()
+
+        if not self._is_level():
+            return self.present_worth_factor() * (
+                self._interest_system.accumulation_factor(self.interest_rate,
+                                                          self._horizon))
+
         return self._accumulation_factor(self.interest_rate, self.periods,
                                          self.first_payment,
                                          self._interest_system)
 
     def capital_recovery_factor(self):
         """Calculates the capital recovery factor."""
+        if not self._is_level():
+            return 1 / self.present_worth_factor()
+
         return self._capital_recovery_factor(self.interest_rate, self.periods,
                                              self.first_payment,
                                              self._interest_system)
 
     def future_value(self, payment, tolerance=0.01):
         """Calculates the future value according to the fixed payment."""
+        self._check_finite()
+
         if (self._payment is not None
                 and abs(payment - self._payment) <= tolerance):
             return self._future_value
@@ -45,12 +97,17 @@ class UniformSeriesPayment(object):
         self._payment = payment
         self._progression = GeometricProgression(payment,
                                                  self._progression_ratio)
-        self._future_value = self._fv_by_pmt(payment, self.interest_rate,
-                                             self.periods, self.first_payment,
-                                             self._interest_system)
+
+        if self._is_level():
+            self._future_value = self._fv_by_pmt(
+                payment, self.interest_rate, self.periods, self.first_payment,
+                self._interest_system)
+        else:
+            self._future_value = payment * self.accumulation_factor()
+
         self._present_value = self._interest_system.present_value(
             self._future_value, interest_rate=self.interest_rate,
-            periods=self.periods)
+            periods=self._horizon)
         return self._future_value
 
     def payment_by_present_value(self, present_value, tolerance=0.01):
@@ -62,16 +119,23 @@ class UniformSeriesPayment(object):
         self._present_value = present_value
         self._future_value = self._interest_system.future_value(
             present_value, interest_rate=self.interest_rate,
-            periods=self.periods)
-        self._payment = self._pmt_by_pv(present_value, self.interest_rate,
-                                        self.periods, self.first_payment,
-                                        self._interest_system)
+            periods=self._horizon)
+
+        if self._is_level():
+            self._payment = self._pmt_by_pv(
+                present_value, self.interest_rate, self.periods,
+                self.first_payment, self._interest_system)
+        else:
+            self._payment = present_value * self.capital_recovery_factor()
+
         self._progression = GeometricProgression(self._payment,
                                                  self._progression_ratio)
         return self._payment
 
     def payment_by_future_value(self, future_value, tolerance=0.01):
         """Calculates the fixed payment according to the future value."""
+        self._check_finite()
+
         if (self._future_value is not None
                 and abs(future_value - self._future_value) <= tolerance):
             return self._payment
@@ -79,10 +143,15 @@ class UniformSeriesPayment(object):
         self._future_value = future_value
         self._present_value = self._interest_system.present_value(
             future_value, interest_rate=self.interest_rate,
-            periods=self.periods)
-        self._payment = self._pmt_by_fv(future_value, self.interest_rate,
-                                        self.periods, self.first_payment,
-                                        self._interest_system)
+            periods=self._horizon)
+
+        if self._is_level():
+            self._payment = self._pmt_by_fv(
+                future_value, self.interest_rate, self.periods,
+                self.first_payment, self._interest_system)
+        else:
+            self._payment = future_value * self.sinking_fund_factor()
+
         self._progression = GeometricProgression(self._payment,
                                                  self._progression_ratio)
         return self._payment
@@ -99,80 +168,560 @@ class UniformSeriesPayment(object):
         self._present_value = self._progression.sum_first_terms(self.periods)
 
         if self.first_payment == 1:
-            self._present_value = self._present_value * self._progression_ratio
+            self._present_value = self._present_value * (
+                self._interest_system.reduction_factor(self.interest_rate, 1))
+
+        if self.deferral:
+            self._present_value = self._present_value * (
+                self._interest_system.reduction_factor(self.interest_rate,
+                                                       self.deferral))
 
         self._future_value = self._interest_system.future_value(
             self._present_value, interest_rate=self.interest_rate,
-            periods=self.periods)
+            periods=self._horizon)
         return self._present_value
 
+    @classmethod
+    def price_batch(cls, interest_rates, periods, first_payments,
+                    present_values):
+        """Calculates the payment, future value and factors of many series
+        at once from arrays of interest rates, periods, first payments and
+        present values."""
+        np = require_numpy()
+        i, n, k, pv = [np.asarray(value) for value in
+                       (interest_rates, periods, first_payments,
+                        present_values)]
+
+        if not np.isin(k, (0, 1)).all():
+            raise TypeError('first payment must be 0 or 1')
+
+        int_sys = CompoundInterest
+        return {
+            'payment': cls._pmt_by_pv(pv, i, n, k, int_sys),
+            'future_value': int_sys.future_value(pv, interest_rate=i,
+                                                 periods=n),
+            'accumulation_factor': cls._accumulation_factor(i, n, k, int_sys),
+            'capital_recovery_factor': cls._capital_recovery_factor(
+                i, n, k, int_sys),
+            'present_worth_factor': cls._present_worth_factor(i, n, k,
+                                                              int_sys),
+            'sinking_fund_factor': cls._sinking_fund_factor(i, n, k, int_sys),
+        }
+
+    @classmethod
+    def payment_by_present_value_batch(cls, present_values, interest_rates,
+                                       periods, first_payments=1,
+                                       growth_rates=0, deferrals=0):
+        """Calculates the first payments of many series according to their
+        present values."""
+        return present_values / cls.present_worth_factor_batch(
+            interest_rates, periods, first_payments, growth_rates, deferrals)
+
+    @classmethod
+    def periods_from_payment(cls, payments, interest_rates,
+                             present_values=None, future_values=None,
+                             first_payments=1):
+        """Calculates the number of periods of many level series from
+        their payments and present values or future values. Returns NaN
+        where the payment never settles the value."""
+        np = require_numpy()
+        pmt, i, k = [np.asarray(value, dtype=float) for value in
+                     (payments, interest_rates, first_payments)]
+        pmt = pmt / _k_factor(k, CompoundInterest.reduction_factor(i, 1))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if present_values is not None:
+                value = np.asarray(present_values, dtype=float)
+                accum_factor_n = pmt / (pmt - value*i)
+            else:
+                value = np.asarray(future_values, dtype=float)
+                accum_factor_n = 1 + value*i/pmt
+
+            periods = np.log(accum_factor_n) / np.log1p(i)
+            return np.where(i == 0, value / pmt, periods)
+
     def present_worth_factor(self):
         """Calculates the present worth factor."""
+        if not self._is_level():
+            return self._growing_present_worth_factor(
+                self.interest_rate, self.periods, self.first_payment,
+                self.growth_rate, self.deferral, self._interest_system)
+
         return self._present_worth_factor(self.interest_rate, self.periods,
                                           self.first_payment,
                                           self._interest_system)
 
+    @classmethod
+    def rate_from_payment(cls, payments, periods, present_values=None,
+                          future_values=None, first_payments=1,
+                          growth_rates=0, deferrals=0, guess=None,
+                          lower=-0.99, upper=1.0, tolerance=1e-12,
+                          max_iterations=100):
+        """Calculates the implied interest rate of many series from their
+        payments and present values or future values, by Newton's method
+        safeguarded by bisection. A previous solution can be given as
+        guess to warm start the solver. Returns the rates and a mask of
+        the series that converged."""
+        np = require_numpy()
+        by_present_value = present_values is not None
+        value = present_values if by_present_value else future_values
+        pmt, value, n, k, g, d = [
+            np.ravel(column).astype(float) for column in np.broadcast_arrays(
+                payments, value, periods, first_payments, growth_rates,
+                deferrals)]
+
+        def equation(rates, index):
+            if by_present_value:
+                factor, derivative, _ = (
+                    cls._growing_present_worth_factor_derivatives(
+                        rates, n[index], k[index], g[index], d[index]))
+            else:
+                factor, derivative = (
+                    cls._growing_accumulation_factor_derivative(
+                        rates, n[index], k[index], g[index]))
+
+            with np.errstate(all='ignore'):
+                return (pmt[index]*factor - value[index],
+                        pmt[index]*derivative)
+
+        index = np.arange(pmt.size)
+        lower = np.full(pmt.size, float(lower))
+        upper = np.full(pmt.size, float(upper))
+        f_lower = equation(lower, index)[0]
+
+        for _ in range(4):
+            unbracketed = np.sign(f_lower) == np.sign(equation(upper,
+                                                               index)[0])
+
+            if not unbracketed.any():
+                break
+
+            upper[unbracketed] *= 10
+
+        return newton_bracketed(equation, lower, upper, guess=guess,
+                                tolerance=tolerance,
+                                max_iterations=max_iterations)
+
+    def risk_measures(self, payment):
+        """Calculates the present value of the series together with its
+        Macaulay and modified durations, convexity and DV01, from the
+        closed-form present worth factor and its rate derivatives."""
+        factors = self._growing_present_worth_factor_derivatives(
+            self.interest_rate, self.periods, self.first_payment,
+            self.growth_rate, self.deferral)
+        return _risk_measures(payment, self.interest_rate, *factors)
+
+    @classmethod
+    def risk_measures_batch(cls, payments, interest_rates, periods,
+                            first_payments=1, growth_rates=0, deferrals=0):
+        """Calculates the risk measures of many series in a single pass.
+        Each entry of the returned dictionary is an array with one value
+        per series."""
+        np = require_numpy()
+        pmt, i, n, k, g, d = [np.asarray(value, dtype=float) for value in
+                              (payments, interest_rates, periods,
+                               first_payments, growth_rates, deferrals)]
+        factors = cls._growing_present_worth_factor_derivatives(i, n, k, g, d)
+
+        with np.errstate(all='ignore'):
+            return _risk_measures(pmt, i, *factors)
+
+    def schedule(self, present_value, system=PRICE):
+        """Returns an iterator over the amortization schedule of a loan
+        under the Price (constant payment) or SAC (constant amortization)
+        system."""
+        self._check_system(system)
+
+        if not self._is_level():
+            raise TypeError('schedules require a finite series without '
+                            'deferral or growth')
+
+        if system == PRICE:
+            return self._price_schedule(present_value)
+
+        return self._sac_schedule(present_value)
+
+    @classmethod
+    def schedule_batch(cls, present_values, interest_rates, periods,
+                       first_payment=1, system=PRICE, dtype=None):
+        """Calculates the amortization schedules of many loans under the
+        Price or SAC system. Returns a dict of payment, interest,
+        amortization and balance arrays with one row per loan and one
+        column per installment, zero after the last installment."""
+        np = require_numpy()
+        cls._check_system(system)
+
+        if first_payment not in (0, 1):
+            raise TypeError('first payment must be 0 or 1')
+
+        pv, i, n = [np.ravel(value).astype(float) for value in
+                    np.broadcast_arrays(present_values, interest_rates,
+                                        periods)]
+        pv, i, n = pv[:, np.newaxis], i[:, np.newaxis], n[:, np.newaxis]
+        j = np.arange(int(n.max()))
+
+        if system == PRICE:
+            payment = cls._pmt_by_pv(pv, i, n, first_payment, CompoundInterest)
+            amortization = payment * CompoundInterest.reduction_factor(
+                i, n - j)
+
+            if first_payment == 0:
+                amortization[:, 0] = payment[:, 0]
+
+            payment = np.broadcast_to(payment, amortization.shape)
+            interest = payment - amortization
+            balance = pv - np.cumsum(amortization, axis=1)
+        else:
+            amortization = np.broadcast_to(pv / n, (pv.shape[0], j.size))
+            interest = i * (pv - j*amortization)
+
+            if first_payment == 0:
+                interest[:, 0] = 0
+
+            payment = amortization + interest
+            balance = pv - (j + 1)*amortization
+
+        installment = j < n
+        columns = {'payment': payment, 'interest': interest,
+                   'amortization': amortization, 'balance': balance}
+        return {name: np.where(installment, column, 0).astype(
+                    dtype or float, copy=False)
+                for name, column in columns.items()}
+
+    @classmethod
+    def present_value_batch(cls, payments, interest_rates, periods,
+                            first_payments=1, growth_rates=0, deferrals=0):
+        """Calculates the present values of many series according to their
+        first payments."""
+        return payments * cls.present_worth_factor_batch(
+            interest_rates, periods, first_payments, growth_rates, deferrals)
+
+    @classmethod
+    def present_worth_factor_batch(cls, interest_rates, periods,
+                                   first_payments=1, growth_rates=0,
+                                   deferrals=0):
+        """Calculates the present worth factors of many series, which may
+        be deferred, perpetual (periods of inf) or growing, in closed
+        form."""
+        np = require_numpy()
+        i, n, k, g, d = [np.asarray(value, dtype=float) for value in
+                         (interest_rates, periods, first_payments,
+                          growth_rates, deferrals)]
+        return cls._growing_present_worth_factor(i, n, k, g, d,
+                                                 CompoundInterest)
+
     def sinking_fund_factor(self):
         """Calculates the sinking fund factor."""
+        self._check_finite()
+
+        if not self._is_level():
+            return 1 / self.accumulation_factor()
+
         return self._sinking_fund_factor(self.interest_rate, self.periods,
                                          self.first_payment,
                                          self._interest_system)
 
+    def _check_finite(self):
+        """If the series is a perpetuity, which has no future value, throws
+        TypeError exception."""
+        if self.periods == math.inf:
+            raise TypeError('a perpetuity has no future value')
+
+    @staticmethod
+    def _check_system(system):
+        """If the amortization system is not allowed, throws TypeError
+        exception."""
+        if system not in (PRICE, SAC):
+            raise TypeError('system must be {!r} or {!r}'.format(PRICE, SAC))
+
+    def _is_level(self):
+        """Checks whether the series is a finite, immediate series of
+        level payments."""
+        return (self.growth_rate == 0 and self.deferral == 0
+                and self.periods != math.inf)
+
+    def _first_row(self, payment, amortization, present_value):
+        """Returns the row paid on the loan date, when the first payment
+        is at the beginning of the series."""
+        return ScheduleRow(0, payment, 0.0, amortization,
+                           present_value - amortization)
+
+    def _price_schedule(self, present_value):
+        """Yields the rows of a Price amortization schedule."""
+        payment = self._pmt_by_pv(present_value, self.interest_rate,
+                                  self.periods, self.first_payment,
+                                  self._interest_system)
+        balance = present_value
+        remaining = self.periods
+
+        if self.first_payment == 0:
+            row = self._first_row(payment, payment, present_value)
+            balance = row.balance
+            remaining -= 1
+            yield row
+
+        amortizations = GeometricProgression(
+            payment * self._progression_ratio**remaining,
+            1 / self._progression_ratio)
+
+        for period, amortization in enumerate(
+                amortizations.iter_terms(1, remaining + 1), start=1):
+            balance -= amortization
+            yield ScheduleRow(period, payment, payment - amortization,
+                              amortization, balance)
+
+    def _sac_schedule(self, present_value):
+        """Yields the rows of a SAC amortization schedule."""
+        amortization = present_value / self.periods
+        balance = present_value
+        remaining = self.periods
+
+        if self.first_payment == 0:
+            row = self._first_row(amortization, amortization, present_value)
+            balance = row.balance
+            remaining -= 1
+            yield row
+
+        interests = ArithmeticProgression(self.interest_rate * balance,
+                                          -self.interest_rate * amortization)
+
+        for period, interest in enumerate(
+                interests.iter_terms(1, remaining + 1), start=1):
+            balance -= amortization
+            yield ScheduleRow(period, amortization + interest, interest,
+                              amortization, balance)
+
+    @staticmethod
+    def _growing_present_worth_factor(i, n, k, g, d, int_sys):
+        reduc_factor_1 = int_sys.reduction_factor(i, 1)
+        ratio = int_sys.accumulation_factor(g, 1) * reduc_factor_1
+        k_factor = _k_factor(k, int_sys.accumulation_factor(i, 1))
+        d_factor = int_sys.reduction_factor(i, d)
+        level = i == g
+
+        with _ignore_float_errors():
+            factor = _where(level, n * reduc_factor_1,
+                            (1 - ratio**n) / _where(level, 1, i - g))
+
+        return factor * k_factor * d_factor
+
+    @staticmethod
+    def _growing_accumulation_factor_derivative(i, n, k, g):
+        """Returns the accumulation factor of compound interest series and
+        its derivative with respect to the interest rate. A deferral does
+        not change it."""
+        u = 1 + i
+        h = i - g
+
+        with np.errstate(all='ignore'):
+            accum_factor_n = u**n
+            factor = np.where(h == 0, n*u**(n - 1),
+                              (accum_factor_n - (1 + g)**n)/h)
+            derivative = np.where(h == 0, n*(n - 1)*u**(n - 2)/2,
+                                  n*u**(n - 1)/h - factor/h)
+            derivative = np.where(k == 0, factor + u*derivative, derivative)
+            factor = np.where(k == 0, u*factor, factor)
+            return factor, derivative
+
+    @staticmethod
+    def _growing_present_worth_factor_derivatives(i, n, k, g, d):
+        """Returns the present worth factor of compound interest series and
+        its first and second derivatives with respect to the interest
+        rate, for numbers or arrays."""
+        u = 1 + i
+        level = i == g
+        # 1 stands in for i - g in the discarded branch of level series.
+        h = _where(level, 1, i - g)
+        infinite = n == math.inf
+
+        with _ignore_float_errors():
+            ratio_n = ((1 + g) / u)**n
+            n_ratio_n = _where(infinite, 0.0, n*ratio_n)
+            n2_ratio_n = _where(infinite, 0.0, n_ratio_n*((n + 1)*h + u))
+            factor = _where(level, n/u, (1 - ratio_n)/h)
+            first = _where(level, -n*(n + 1)/(2*u**2),
+                           n_ratio_n/(u*h) - factor/h)
+            second = _where(level, n*(n + 1)*(n + 2)/(3*u**3),
+                            -n2_ratio_n/(u*h)**2 - first/h + factor/h**2)
+            second = _where(k == 0, 2*first + u*second, second)
+            first = _where(k == 0, factor + u*first, first)
+            factor = _where(k == 0, u*factor, factor)
+            d_factor = u**-d
+            second = _where(d == 0, second, d_factor*(
+                second - 2*d*first/u + d*(d + 1)*factor/u**2))
+            first = _where(d == 0, first, d_factor*(first - d*factor/u))
+            return factor*d_factor, first, second
+
     @staticmethod
     def _accumulation_factor(i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        accum_factor_1 = int_sys.accumulation_factor(i, 1)
-        k_factor = accum_factor_1 if k == 0 else 1
-        return ((accum_factor_n - 1) / i) * k_factor
+        return _cached_factor(_compute_accumulation_factor, i, n, k,
+                              int_sys)
 
     @staticmethod
     def _capital_recovery_factor(i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        reduc_factor_1 = int_sys.reduction_factor(i, 1)
-        k_factor = reduc_factor_1 if k == 0 else 1
-        return ((accum_factor_n * i) / (accum_factor_n - 1)) * k_factor
+        return _cached_factor(_compute_capital_recovery_factor, i, n, k,
+                              int_sys)
 
     @staticmethod
     def _fv_by_pmt(pmt, i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        accum_factor_1 = int_sys.accumulation_factor(i, 1)
-        k_factor = accum_factor_1 if k == 0 else 1
-        return pmt * ((accum_factor_n - 1) / i) * k_factor
+        return pmt * _cached_factor(_compute_accumulation_factor, i, n, k,
+                                    int_sys)
 
     @staticmethod
     def _pmt_by_fv(fv, i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        reduc_factor_1 = int_sys.reduction_factor(i, 1)
-        k_factor = reduc_factor_1 if k == 0 else 1
-        return fv * (i / (accum_factor_n - 1)) * k_factor
+        return fv * _cached_factor(_compute_sinking_fund_factor, i, n, k,
+                                   int_sys)
 
     @staticmethod
     def _pmt_by_pv(pv, i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        reduc_factor_1 = int_sys.reduction_factor(i, 1)
-        k_factor = reduc_factor_1 if k == 0 else 1
-        return pv * ((i * accum_factor_n) / (accum_factor_n - 1)) * k_factor
+        return pv * _cached_factor(_compute_capital_recovery_factor, i, n,
+                                   k, int_sys)
 
     @staticmethod
     def _present_worth_factor(i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        accum_factor_1 = int_sys.accumulation_factor(i, 1)
-        k_factor = accum_factor_1 if k == 0 else 1
-        return ((accum_factor_n - 1) / (i * accum_factor_n)) * k_factor
+        return _cached_factor(_compute_present_worth_factor, i, n, k,
+                              int_sys)
 
     @staticmethod
     def _pv_by_pmt(pmt, i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        accum_factor_1 = int_sys.accumulation_factor(i, 1)
-        k_factor = accum_factor_1 if k == 0 else 1
-        return pmt * ((accum_factor_n - 1) / (i * accum_factor_n)) * k_factor
+        return pmt * _cached_factor(_compute_present_worth_factor, i, n, k,
+                                    int_sys)
 
     @staticmethod
     def _sinking_fund_factor(i, n, k, int_sys):
-        accum_factor_n = int_sys.accumulation_factor(i, n)
-        reduc_factor_1 = int_sys.reduction_factor(i, 1)
-        k_factor = reduc_factor_1 if k == 0 else 1
-        return (i / (accum_factor_n - 1)) * k_factor
+        return _cached_factor(_compute_sinking_fund_factor, i, n, k,
+                              int_sys)
+
+
+class FrozenUniformSeriesPayment(FrozenObject):
+    """Class for immutable uniform series of payments. Results are
+    computed in closed form, without caching or progression objects."""
+
+    __slots__ = ('interest_rate', 'periods', 'first_payment')
+    _fields = __slots__
+
+    def __init__(self, interest_rate, periods, first_payment):
+        """Initializes a FrozenUniformSeriesPayment instance."""
+        if first_payment not in (0, 1):
+            raise TypeError('first payment must be 0 or 1')
+
+        super().__init__(interest_rate, periods, first_payment)
+
+    def _apply(self, helper, value=None):
+        """Calls a UniformSeriesPayment helper with the series terms."""
+        args = (self.interest_rate, self.periods, self.first_payment,
+                CompoundInterest)
+        return helper(*args) if value is None else helper(value, *args)
+
+    def accumulation_factor(self):
+        """Calculates the accumulation factor."""
+        return self._apply(UniformSeriesPayment._accumulation_factor)
+
+    def capital_recovery_factor(self):
+        """Calculates the capital recovery factor."""
+        return self._apply(UniformSeriesPayment._capital_recovery_factor)
+
+    def future_value(self, payment):
+        """Calculates the future value according to the fixed payment."""
+        return self._apply(UniformSeriesPayment._fv_by_pmt, payment)
+
+    def payment_by_future_value(self, future_value):
+        """Calculates the fixed payment according to the future value."""
+        return self._apply(UniformSeriesPayment._pmt_by_fv, future_value)
+
+    def payment_by_present_value(self, present_value):
+        """Calculates the fixed payment according to the present value."""
+        return self._apply(UniformSeriesPayment._pmt_by_pv, present_value)
+
+    def present_value(self, payment):
+        """Calculates the present value according to the fixed payment."""
+        return self._apply(UniformSeriesPayment._pv_by_pmt, payment)
+
+    def present_worth_factor(self):
+        """Calculates the present worth factor."""
+        return self._apply(UniformSeriesPayment._present_worth_factor)
+
+    def sinking_fund_factor(self):
+        """Calculates the sinking fund factor."""
+        return self._apply(UniformSeriesPayment._sinking_fund_factor)
+
+
+def _cached_factor(factor, i, n, k, int_sys):
+    """Returns factor(i, n, k, int_sys), from the shared factor cache when
+    it is enabled and the arguments are numbers."""
+    if factor_cache.maxsize == 0:
+        return factor(i, n, k, int_sys)
+
+    key = (factor, i, n, k, int_sys)
+
+    try:
+        value = factor_cache.get(key)
+    except TypeError:
+        return factor(i, n, k, int_sys)
+
+    if value is None:
+        value = factor(i, n, k, int_sys)
+        factor_cache[key] = value
+
+    return value
+
+
+def _compute_accumulation_factor(i, n, k, int_sys):
+    accum_factor_n = int_sys.accumulation_factor(i, n)
+    k_factor = _k_factor(k, int_sys.accumulation_factor(i, 1))
+    return ((accum_factor_n - 1) / i) * k_factor
+
+
+def _compute_capital_recovery_factor(i, n, k, int_sys):
+    accum_factor_n = int_sys.accumulation_factor(i, n)
+    k_factor = _k_factor(k, int_sys.reduction_factor(i, 1))
+    return ((accum_factor_n * i) / (accum_factor_n - 1)) * k_factor
+
+
+def _compute_present_worth_factor(i, n, k, int_sys):
+    accum_factor_n = int_sys.accumulation_factor(i, n)
+    k_factor = _k_factor(k, int_sys.accumulation_factor(i, 1))
+    return ((accum_factor_n - 1) / (i * accum_factor_n)) * k_factor
+
+
+def _compute_sinking_fund_factor(i, n, k, int_sys):
+    accum_factor_n = int_sys.accumulation_factor(i, n)
+    k_factor = _k_factor(k, int_sys.reduction_factor(i, 1))
+    return (i / (accum_factor_n - 1)) * k_factor
+
+
+def _risk_measures(pmt, i, factor, first, second):
+    """Builds the risk measures of series from their payments, interest
+    rates and present worth factors with their rate derivatives."""
+    modified_duration = -first / factor
+    return {
+        'net_present_value': pmt * factor,
+        'macaulay_duration': (1 + i) * modified_duration,
+        'modified_duration': modified_duration,
+        'convexity': second / factor,
+        'dv01': -pmt * first * BASIS_POINT,
+    }
+
+
+def _k_factor(k, factor):
+    """Returns the factor for series whose first payment is at the
+    beginning (k == 0), otherwise 1."""
+    return _where(k == 0, factor, 1)
+
+
+def _where(condition, if_true, if_false):
+    """Chooses between two values by condition, elementwise if the
+    condition is an array."""
+    if np is not None and isinstance(condition, np.ndarray):
+        return np.where(condition, if_true, if_false)
+
+    return if_true if condition else if_false
+
+
+def _ignore_float_errors():
+    """Returns a context silencing NumPy floating point warnings for
+    formulas evaluated on both sides of a _where."""
+    return np.errstate(all='ignore') if np is not None else nullcontext()
 
 
 if __name__ == '__main__':
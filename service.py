@@ -0,0 +1,356 @@
+#! python3
+# service.py - Local asyncio pricing service with request coalescing.
+
+import asyncio
+import json
+import math
+
+from arrays import is_array
+from arrays import np
+from interest import CompoundInterest
+from series import UniformSeriesPayment
+
+
+def _check_first_payment(first_payment):
+    """If the first payment is not allowed, throws TypeError exception."""
+    if is_array(first_payment):
+        allowed = np.isin(first_payment, (0, 1)).all()
+    else:
+        allowed = first_payment in (0, 1)
+
+    if not allowed:
+        raise TypeError('first payment must be 0 or 1')
+
+
+def _payment_by_future_value(future_value, interest_rate, periods,
+                             first_payment):
+    _check_first_payment(first_payment)
+    return UniformSeriesPayment._pmt_by_fv(future_value, interest_rate,
+                                           periods, first_payment,
+                                           CompoundInterest)
+
+
+def _payment_by_present_value(present_value, interest_rate, periods,
+                              first_payment):
+    _check_first_payment(first_payment)
+    return UniformSeriesPayment._pmt_by_pv(present_value, interest_rate,
+                                           periods, first_payment,
+                                           CompoundInterest)
+
+
+def _present_value(future_value, interest_rate, periods):
+    return CompoundInterest.present_value(future_value,
+                                          interest_rate=interest_rate,
+                                          periods=periods)
+
+
+def _future_value(present_value, interest_rate, periods):
+    return CompoundInterest.future_value(present_value,
+                                         interest_rate=interest_rate,
+                                         periods=periods)
+
+
+def _compute_one(func, args):
+    """Computes a single argument tuple. Returns the result, or the
+    exception for a failure or a result that is not a finite real
+    number."""
+    try:
+        result = func(*args)
+
+        if not math.isfinite(result):
+            return ValueError('result is not finite')
+    except Exception as exc:
+        return exc
+
+    return result
+
+
+# Operations by name: the argument names and a function that accepts
+# either numbers or arrays.
+OPERATIONS = {
+    'future_value': (('present_value', 'interest_rate', 'periods'),
+                     _future_value),
+    'payment_by_future_value': (('future_value', 'interest_rate', 'periods',
+                                 'first_payment'), _payment_by_future_value),
+    'payment_by_present_value': (('present_value', 'interest_rate',
+                                  'periods', 'first_payment'),
+                                 _payment_by_present_value),
+    'present_value': (('future_value', 'interest_rate', 'periods'),
+                      _present_value),
+}
+
+
+class PricingServer(object):
+    """Class for a pricing server speaking JSON lines over a Unix socket or
+    localhost TCP. Concurrent requests for the same operation are
+    gathered for batch_window seconds, or until batch_size requests, and
+    computed in one vectorized call; identical requests in flight share a
+    single result."""
+
+    def __init__(self, batch_window=0.002, batch_size=1024):
+        """Initializes a PricingServer instance."""
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self._in_flight = {}
+        self._pending = {}
+        self._timers = {}
+
+    @staticmethod
+    def _compute(func, batch):
+        """Computes a batch of argument tuples, vectorized when NumPy is
+        available. Returns a result or an exception for each tuple. Tuples
+        whose vectorized result is not finite are computed on their own,
+        so every request gets the same answer whatever its batch."""
+        results = None
+
+        if np is not None and len(batch) > 1:
+            try:
+                columns = [np.asarray(column) for column in zip(*batch)]
+
+                with np.errstate(all='ignore'):
+                    values = np.asarray(func(*columns), dtype=float)
+
+                results = values.tolist()
+                retry = np.flatnonzero(~np.isfinite(values)).tolist()
+            except Exception:
+                pass
+
+        if results is None:
+            results = [None] * len(batch)
+            retry = range(len(batch))
+
+        for index in retry:
+            results[index] = _compute_one(func, batch[index])
+
+        return results
+
+    def _flush(self, op):
+        """Computes the pending requests of an operation."""
+        timer = self._timers.pop(op, None)
+
+        if timer is not None:
+            timer.cancel()
+
+        keys = self._pending.pop(op, [])
+        results = None
+
+        if not keys:
+            return
+
+        try:
+            results = self._compute(OPERATIONS[op][1],
+                                    [key[1] for key in keys])
+        except Exception as exc:
+            results = [exc] * len(keys)
+        finally:
+            if results is None:
+                results = [RuntimeError('batch was interrupted')] * len(keys)
+
+            for key, result in zip(keys, results):
+                future = self._in_flight.pop(key)
+
+                if future.done():
+                    continue
+
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _handle_connection(self, reader, writer):
+        """Answers the requests of a connection, one JSON object per
+        line, as they complete."""
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            request_id = None
+
+            try:
+                request = json.loads(line)
+                request_id = request.get('id')
+                result = await self.submit(request['op'], request['args'])
+                response = {'id': request_id, 'result': result}
+            except Exception as exc:
+                response = {'id': request_id, 'error': str(exc)}
+
+            async with lock:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                task = asyncio.ensure_future(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """Starts listening on a Unix socket path or on a localhost TCP
+        port. Returns the asyncio server."""
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle_connection,
+                                                   path)
+
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def submit(self, op, args):
+        """Queues a request and waits for its result."""
+        try:
+            names, _ = OPERATIONS[op]
+        except KeyError:
+            raise ValueError('unknown operation {!r}'.format(op)) from None
+
+        try:
+            key = (op, tuple(args[name] for name in names))
+        except KeyError as exc:
+            raise ValueError('missing argument {}'.format(exc)) from None
+
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        loop = asyncio.get_running_loop()
+        future = self._in_flight[key] = loop.create_future()
+        pending = self._pending.setdefault(op, [])
+        pending.append(key)
+
+        if len(pending) >= self.batch_size:
+            self._flush(op)
+        elif op not in self._timers:
+            self._timers[op] = loop.call_later(self.batch_window,
+                                               self._flush, op)
+
+        return await asyncio.shield(future)
+
+
+class PricingClient(object):
+    """Class for a PricingServer client keeping a pool of up to pool_size
+    connections. Calls are spread over the connections in turn and
+    pipelined: each connection carries many requests at once, and the
+    responses are matched to them by id."""
+
+    def __init__(self, path=None, host='127.0.0.1', port=None, pool_size=4):
+        """Initializes a PricingClient instance."""
+        self.path = path
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self._connections = []
+        self._lock = asyncio.Lock()
+        self._next_connection = 0
+        self._next_id = 0
+
+    async def _acquire(self):
+        """Returns the next connection in turn, opening one while the pool
+        has room."""
+        async with self._lock:
+            self._connections = [connection for connection in
+                                 self._connections if not connection.closed]
+
+            if len(self._connections) < self.pool_size:
+                if self.path is not None:
+                    streams = await asyncio.open_unix_connection(self.path)
+                else:
+                    streams = await asyncio.open_connection(self.host,
+                                                            self.port)
+
+                connection = _Connection(*streams)
+                self._connections.append(connection)
+                return connection
+
+        self._next_connection = (self._next_connection + 1) % len(
+            self._connections)
+        return self._connections[self._next_connection]
+
+    async def call(self, op, **args):
+        """Calls an operation on the server and returns its result."""
+        self._next_id += 1
+        request = {'id': self._next_id, 'op': op, 'args': args}
+        connection = await self._acquire()
+        response = await connection.request(request)
+
+        if 'error' in response:
+            raise ValueError(response['error'])
+
+        return response['result']
+
+    async def close(self):
+        """Closes the connections."""
+        connections, self._connections = self._connections, []
+
+        for connection in connections:
+            await connection.close()
+
+
+class _Connection(object):
+    """Class for a pipelined connection to a PricingServer. Requests are
+    written as they are made and a reader task resolves them as their
+    responses arrive, in any order."""
+
+    def __init__(self, reader, writer):
+        """Initializes a _Connection instance."""
+        self.closed = False
+        self._writer = writer
+        self._waiting = {}
+        self._reader_task = asyncio.ensure_future(self._read(reader))
+
+    async def _read(self, reader):
+        """Resolves the waiting requests with the responses read. When the
+        connection ends, the requests still waiting fail."""
+        error = ConnectionError('connection closed by the server')
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                response = json.loads(line)
+                future = self._waiting.pop(response.get('id'), None)
+
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except Exception as exc:
+            error = exc
+        finally:
+            self.closed = True
+
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+
+            self._waiting.clear()
+
+    async def close(self):
+        """Closes the connection."""
+        self.closed = True
+        self._reader_task.cancel()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def request(self, request):
+        """Sends a request and waits for its response."""
+        if self.closed:
+            raise ConnectionError('connection closed')
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request['id']] = future
+
+        try:
+            self._writer.write(json.dumps(request).encode() + b'\n')
+            await self._writer.drain()
+        except Exception:
+            self._waiting.pop(request['id'], None)
+            raise
+
+        return await future
@@ -0,0 +1,64 @@
+#! python3
+# solver.py - Root finding for batches of equations.
+
+from arrays import require_numpy
+
+
+def newton_bracketed(func, lower, upper, guess=None, tolerance=1e-10,
+                     max_iterations=100):
+    """Finds a root of each equation by Newton's method, falling back to
+    bisection when a step leaves the bracket or does not halve the
+    previous one. func(x, index) returns the values and the
+    derivatives of the equations selected by index at x. Returns the roots
+    (NaN where lower and upper do not bracket a root) and a mask of the
+    equations that converged."""
+    np = require_numpy()
+    lower, upper = np.broadcast_arrays(np.array(lower, dtype=float),
+                                       np.array(upper, dtype=float))
+    lower = lower.astype(float).ravel()
+    upper = upper.astype(float).ravel()
+    index = np.arange(lower.size)
+    f_lower = func(lower, index)[0]
+    f_upper = func(upper, index)[0]
+    bracketed = np.sign(f_lower) * np.sign(f_upper) <= 0
+    x = (lower + upper) / 2
+
+    if guess is not None:
+        guess = np.broadcast_to(np.asarray(guess, dtype=float), x.shape)
+        inside = (guess > lower) & (guess < upper)
+        x = np.where(inside, guess, x)
+
+    roots = np.full(x.shape, np.nan)
+    converged = np.zeros(x.shape, dtype=bool)
+    previous_step = upper - lower
+    active = np.flatnonzero(bracketed)
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+
+        value, derivative = func(x[active], active)
+        same_side = np.sign(value) == np.sign(f_lower[active])
+        lower[active] = np.where(same_side, x[active], lower[active])
+        f_lower[active] = np.where(same_side, value, f_lower[active])
+        upper[active] = np.where(same_side, upper[active], x[active])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = x[active] - value/derivative
+
+        bisection = (lower[active] + upper[active]) / 2
+        outside = ~((step > lower[active]) & (step < upper[active]))
+        slow = np.abs(step - x[active]) > np.abs(previous_step[active]) / 2
+        step = np.where(outside | slow, bisection, step)
+        zero = np.abs(value) <= tolerance
+        step = np.where(zero, x[active], step)
+        done = zero | (np.abs(step - x[active])
+                       <= tolerance*(1 + np.abs(x[active])))
+        previous_step[active] = step - x[active]
+        x[active] = step
+        roots[active[done]] = step[done]
+        converged[active[done]] = True
+        active = active[~done]
+
+    roots[active] = x[active]
+    return roots, converged
@@ -0,0 +1,152 @@
+#! python3
+# store.py - Memory-mapped binary store of cash flows.
+
+import struct
+
+from arrays import require_numpy
+from interest import CompoundInterest
+
+MAGIC = b'FPYCF001'
+# Header: magic, number of flows and number of instruments, padded so the
+# flows start 64-byte aligned.
+HEADER = struct.Struct('<8sQQ')
+HEADER_SIZE = 64
+FLOW_FIELDS = ('amount', 'period', 'rate')
+
+
+def _flow_dtype():
+    """Returns the fixed-width record type of a flow."""
+    np = require_numpy()
+    return np.dtype([(name, '<f8') for name in FLOW_FIELDS])
+
+
+class CashFlowStore(object):
+    """Class for a read-only store of the cash flows of many instruments,
+    memory-mapped from a file written by write_store. Flows are fixed-width
+    (amount, period, rate) records, followed by an index of the first flow
+    of each instrument. Valuations run directly over the mapped buffers."""
+
+    def __init__(self, path):
+        """Initializes a CashFlowStore instance."""
+        np = require_numpy()
+
+        with open(path, 'rb') as store_file:
+            magic, flow_count, instrument_count = HEADER.unpack(
+                store_file.read(HEADER.size))
+
+        if magic != MAGIC:
+            raise ValueError('{} is not a cash flow store'.format(path))
+
+        self.path = path
+        dtype = _flow_dtype()
+        self.flows = np.memmap(path, dtype=dtype, mode='r',
+                               offset=HEADER_SIZE, shape=(flow_count,))
+        index_offset = HEADER_SIZE + flow_count*dtype.itemsize
+        self.offsets = np.memmap(path, dtype='<i8', mode='r',
+                                 offset=index_offset,
+                                 shape=(instrument_count + 1,))
+
+    def __getitem__(self, k):
+        """Returns views of the amounts, periods and rates of the kth
+        instrument."""
+        if not -len(self) <= k < len(self):
+            raise IndexError('instrument index out of range')
+
+        k %= len(self)
+        flows = self.flows[self.offsets[k]:self.offsets[k + 1]]
+        return tuple(flows[name] for name in FLOW_FIELDS)
+
+    def __len__(self):
+        return self.offsets.size - 1
+
+    def _evaluate(self, factor, chunk_size):
+        """Sums amount*factor(rate, period, index) per instrument, a chunk
+        of flows at a time."""
+        np = require_numpy()
+        values = np.zeros(len(self))
+
+        for start in range(0, self.flows.size, chunk_size):
+            chunk = self.flows[start:start + chunk_size]
+            index = np.arange(start, start + chunk.size)
+            instruments = np.searchsorted(self.offsets, index,
+                                          side='right') - 1
+            weights = chunk['amount'] * factor(chunk['rate'], chunk['period'],
+                                               instruments)
+            first = instruments[0]
+            values[first:instruments[-1] + 1] += np.bincount(
+                instruments - first, weights=weights)
+
+        return values
+
+    def future_values(self, interest_system=CompoundInterest, horizons=None,
+                      chunk_size=1 << 20):
+        """Calculates the future value of every instrument at its horizon,
+        by default the period of its last flow."""
+        np = require_numpy()
+
+        if horizons is None and self.flows.size == 0:
+            horizons = 0
+        elif horizons is None:
+            last = np.maximum(self.offsets[1:] - 1, 0)
+            horizons = np.where(self.offsets[1:] > self.offsets[:-1],
+                                self.flows['period'][last], 0)
+
+        horizons = np.broadcast_to(np.asarray(horizons, dtype=float),
+                                   (len(self),))
+        return self._evaluate(
+            lambda i, n, k: interest_system.accumulation_factor(
+                i, horizons[k] - n), chunk_size)
+
+    def net_present_value(self, k, interest_system=CompoundInterest):
+        """Calculates the net present value of the kth instrument."""
+        amounts, periods, rates = self[k]
+        return float((amounts * interest_system.reduction_factor(
+            rates, periods)).sum())
+
+    def net_present_values(self, interest_system=CompoundInterest,
+                           chunk_size=1 << 20):
+        """Calculates the net present value of every instrument."""
+        return self._evaluate(
+            lambda i, n, k: interest_system.reduction_factor(i, n),
+            chunk_size)
+
+
+def write_store(path, instruments):
+    """Writes the cash flows of an iterable of instruments, each given as
+    amounts, periods and rates, to a store file. Shorter periods or rates
+    (or single numbers) are filled with their last value, as in
+    AbstractInterest.net_present_value. Returns the number of
+    instruments."""
+    np = require_numpy()
+    dtype = _flow_dtype()
+    offsets = [0]
+
+    with open(path, 'wb') as store_file:
+        store_file.write(bytes(HEADER_SIZE))
+
+        for index, (amounts, periods, rates) in enumerate(instruments):
+            columns = [np.atleast_1d(np.asarray(column, dtype=float))
+                       for column in (amounts, periods, rates)]
+            size = max(column.size for column in columns)
+
+            if columns[0].size == 0:
+                size = 0
+            elif columns[1].size == 0 or columns[2].size == 0:
+                raise ValueError('instrument {} has amounts but no periods '
+                                 'or rates'.format(index))
+
+            flows = np.empty(size, dtype=dtype)
+
+            for name, column in zip(FLOW_FIELDS, columns):
+                if size:
+                    flows[name] = np.pad(column, (0, size - column.size),
+                                         mode='edge')
+
+            store_file.write(flows.tobytes())
+            offsets.append(offsets[-1] + size)
+
+        store_file.write(np.asarray(offsets, dtype='<i8').tobytes())
+        store_file.seek(0)
+        store_file.write(HEADER.pack(MAGIC, offsets[-1], len(offsets) - 1))
+
+    return len(offsets) - 1